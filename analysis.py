@@ -0,0 +1,275 @@
+"""Bulk analysis of archived minesweeper board files.
+
+A directory of saved boards (text files in the save_board format, or binary
+files in the save_binary format, told apart by their first bytes) is
+scanned and the boards are loaded and analyzed across a pool of worker
+processes. Every file yields one record:
+    path: the path of the file, relative to the scanned directory
+    rows, columns, mines: the configuration of the board (the mines of a
+        board whose mines are deferred, see Board.defer_mines, included)
+    status: the status of the game on the board (see Game.get_status),
+        after the moves of its journal file, if it has one (see load_file)
+    3bv, openings, isolated: the minimal number of moves that clear the
+        board, its openings and its numbers away from openings (see
+        Board.get_metrics), empty for a board whose mines are deferred
+    density: the fraction of the cells that are mines
+    revealed: the percentage of the non-mine cells that are uncovered (100
+        on a board without them)
+    error: the name of the exception if the file couldn't be loaded (the
+        status is then Error and the other fields are empty)
+The records are written as CSV or as JSON lines, in the order of the files,
+as soon as they are ready: the workers only get file names and return
+records, so no board outlives its analysis, and memory use doesn't depend
+on the number of files. The aggregate statistics of all the records are
+written as JSON at the end (see Summary).
+"""
+import argparse
+import csv
+import fnmatch
+import functools
+import json
+import multiprocessing
+import os
+import sys
+
+import minesweeper
+
+FIELDS = ('path', 'rows', 'columns', 'mines', 'status', '3bv', 'openings', 'isolated', 'density',
+          'revealed', 'error')
+
+STATUS_NAMES = {minesweeper.GameStatus.NotStarted: 'NotStarted',
+                minesweeper.GameStatus.InProgress: 'InProgress',
+                minesweeper.GameStatus.Win: 'Win',
+                minesweeper.GameStatus.Lose: 'Lose'}
+
+
+def load_file(path, large=False):
+    """Loads a saved board, in the text or the binary format.
+
+    The board of a saved game (see Game.save) is saved once, and the moves
+    made after that are only in its journal file, path + '.journal', so the
+    journal is replayed on the board when there is one (see Game.replay).
+    The journal is only read: unlike minesweeper.load_game, this doesn't
+    drop a last event that was only partly written.
+
+    Raises:
+        the exceptions of minesweeper.read_board, Board.load_binary and
+        Game.replay, and IOError in case of any file/IO related problem
+
+    """
+    with open(path, 'rb') as document:
+        binary = document.read(len(minesweeper.Board._MAGIC)) == minesweeper.Board._MAGIC
+    if binary:
+        board = minesweeper.Board.load_binary(path, large)
+    else:
+        with open(path, 'r') as document:
+            board = minesweeper.read_board(document, large)
+    journalFile = path + '.journal'
+    if os.path.exists(journalFile):
+        with open(journalFile, 'r') as document:
+            minesweeper.Game(board).replay(document)
+    return board
+
+
+def analyze_board(board):
+    """Returns the record of a board, without its path (see the module docs)."""
+    rows, columns = board.getRows(), board.getColumns()
+    cells = rows * columns
+    uncoveredSafe = board.getUncoveredCount() - board.getUncoveredMines()
+    mines = board.getPendingMines() or cells - board.getHiddenSafeCount() - uncoveredSafe
+    status = minesweeper.Game(board).get_status()
+    # a board of mines only has no cells to reveal, all of them are revealed
+    revealed = 100.0 * uncoveredSafe / (cells - mines) if cells > mines else 100.0
+    record = {'rows': rows, 'columns': columns, 'mines': mines, 'status': STATUS_NAMES[status],
+              'density': round(float(mines) / cells, 6), 'revealed': round(revealed, 2),
+              'error': None}
+    record.update(board.get_metrics() or dict.fromkeys(('3bv', 'openings', 'isolated')))
+    return record
+
+
+def analyze_file(path, directory, large=False):
+    """Loads and analyzes a saved board, in a worker process.
+
+    A file that can't be loaded yields an Error record instead of raising,
+    so one broken file doesn't stop the analysis of the others.
+
+    Returns:
+        the record of the file (see the module documentation)
+
+    """
+    try:
+        record = analyze_board(load_file(path, large))
+    except Exception as error:
+        record = dict.fromkeys(FIELDS)
+        record.update(status='Error', error=type(error).__name__)
+    record['path'] = os.path.relpath(path, directory)
+    return record
+
+
+def scan(directory, pattern='*'):
+    """Yields the paths of the board files under directory, in sorted order.
+
+    The subdirectories are scanned recursively, and the journals of saved
+    games (see Game.save) are skipped, they are replayed on their boards
+    (see load_file).
+    """
+    for (root, directories, names) in os.walk(directory):
+        directories.sort()
+        for name in sorted(names):
+            if fnmatch.fnmatch(name, pattern) and not name.endswith('.journal'):
+                yield os.path.join(root, name)
+
+
+class Summary(object):
+    """Aggregate statistics of a stream of records."""
+
+    def __init__(self):
+        self.files = self.errors = self.boards = 0
+        self.statuses = dict.fromkeys(STATUS_NAMES.values(), 0)
+        self.cells = self.mines = 0
+        self._bvs, self._bvTotal, self._bvMax = 0, 0, 0
+        self._density = self._revealed = 0.0
+
+    def add(self, record):
+        """Adds a record to the statistics (alters self)."""
+        self.files += 1
+        if record['error'] is not None:
+            self.errors += 1
+            return
+        self.boards += 1
+        self.statuses[record['status']] += 1
+        self.cells += record['rows'] * record['columns']
+        self.mines += record['mines']
+        self._density += record['density']
+        self._revealed += record['revealed']
+        if record['3bv'] is not None:
+            self._bvs += 1
+            self._bvTotal += record['3bv']
+            self._bvMax = max(self._bvMax, record['3bv'])
+
+    def to_dict(self):
+        """Returns the statistics: counts, and means over the loaded boards."""
+        def mean(total, count):
+            return round(float(total) / count, 4) if count else None
+        return {'files': self.files, 'errors': self.errors, 'boards': self.boards,
+                'statuses': dict(self.statuses), 'cells': self.cells, 'mines': self.mines,
+                'mean_3bv': mean(self._bvTotal, self._bvs), 'max_3bv': self._bvMax,
+                'mean_density': mean(self._density, self.boards),
+                'mean_revealed': mean(self._revealed, self.boards)}
+
+
+class CsvWriter(object):
+    """Writes records as CSV rows, after a header row."""
+
+    def __init__(self, stream):
+        self._writer = csv.DictWriter(stream, FIELDS, lineterminator='\n')
+        self._writer.writeheader()
+
+    def write(self, record):
+        self._writer.writerow(record)
+
+
+class JsonWriter(object):
+    """Writes records as JSON lines, one object per line."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, record):
+        self._stream.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+WRITERS = {'csv': CsvWriter, 'json': JsonWriter}
+
+
+def analyze_directory(directory, output, format='csv', workers=None, chunk_size=64,
+                      large=False, pattern='*'):
+    """Analyzes the board files under directory, streaming their records.
+
+    Args:
+        directory: the directory to scan (see scan)
+        output: a file object the records are written to
+        format: 'csv' or 'json' (see WRITERS)
+        workers: the number of worker processes (default: one per CPU); with
+        a single worker the files are analyzed in this process
+        chunk_size: the number of files per job sent to a worker
+        large: allow the dimensions of large boards (see Board)
+        pattern: a shell pattern the file names must match
+
+    Returns:
+        a Summary of the records
+
+    Raises:
+        KeyError for unknown formats, IOError in case of a problem writing
+        to output (files that can't be read only yield Error records)
+
+    """
+    writer = WRITERS[format](output)
+    summary = Summary()
+    analyze = functools.partial(analyze_file, directory=directory, large=large)
+    paths = scan(directory, pattern)
+
+    pool = None
+    if workers == 1:
+        records = (analyze(path) for path in paths)
+    else:
+        pool = multiprocessing.Pool(workers)
+        records = pool.imap(analyze, paths, chunk_size)
+    try:
+        for record in records:
+            writer.write(record)
+            summary.add(record)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return summary
+
+
+def main():
+    """Analyzes a directory of board files according to the command line.
+
+    The records are written to the output file (default: stdout), and the
+    summary to the summary file (default: stderr). Prints "Analysis failed"
+    in case of a file/IO problem with the directory or the output files.
+
+    Returns:
+        None
+
+    Raises:
+        Nothing
+
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument('-o', "--output")
+    parser.add_argument('-s', "--summary")
+    parser.add_argument('-f', "--format", choices=sorted(WRITERS), default='csv')
+    parser.add_argument('-w', "--workers", type=int, default=None)
+    parser.add_argument('-p', "--pattern", default='*')
+    parser.add_argument('-l', "--large", action='store_true')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print('Analysis failed')
+        return
+    try:
+        output = open(args.output, 'w', newline='') if args.output else sys.stdout
+        try:
+            summary = analyze_directory(args.directory, output, args.format, args.workers,
+                                        large=args.large, pattern=args.pattern)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        text = json.dumps(summary.to_dict(), indent=1, sort_keys=True) + '\n'
+        if args.summary:
+            with open(args.summary, 'w') as document:
+                document.write(text)
+        else:
+            sys.stderr.write(text)
+    except (IOError, OSError):
+        print('Analysis failed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+"""Batched minesweeper games on stacked NumPy arrays, for bots and training.
+
+A GameBatch holds K games of the same size as (K, rows, columns) arrays,
+and make_moves applies one move to every game in a single call: the moves
+are validated and uncovered with array indexing, and the ripples of all the
+games are flood filled together, one ring of cells per step, instead of one
+cell at a time.
+
+The outcome of a move is the same as Game.make_move on a Board with the same
+ripple type (the Queue and Recursive ripples uncover the same cells, Simple
+uncovers the row and column arms only), and get_status is the same as
+Game.get_status. The difficulty metrics of all the games (see metrics) are
+computed together too, the same as Board.get_metrics.
+
+NumPy is required by this module.
+"""
+import numpy
+
+import minesweeper
+
+
+class GameBatch(object):
+    """K minesweeper games of the same size, played in lockstep.
+
+    The games are stored in two arrays: values (K, rows, columns) holds the
+    cell values (0-8, or Board.MINE), and shown (K, rows, columns) is True
+    for uncovered cells. Per-game counters of uncovered cells, uncovered
+    mines and hidden safe cells are kept like in Board, so get_status is a
+    few vector operations.
+    """
+
+    def __init__(self, values, shown=None, ripple_type=minesweeper.RippleTypes.Queue):
+        """Initializes a batch of games from their cell arrays.
+
+        Args:
+            values: a (K, rows, columns) integer array of cell values (0-8,
+            or Board.MINE); it is copied
+            shown: an optional (K, rows, columns) boolean array of the
+            uncovered cells (default: all hidden); it is copied
+            ripple_type: one of RippleTypes values (see Board)
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            DimensionsMismatchException if the arrays are not 3 dimensional
+            or their shapes differ.
+            ValueError for unknown ripple types.
+
+        """
+        values = numpy.array(values, dtype=numpy.uint8)
+        if shown is None:
+            shown = numpy.zeros(values.shape, dtype=bool)
+        shown = numpy.array(shown, dtype=bool)
+        if values.ndim != 3 or shown.shape != values.shape:
+            raise minesweeper.DimensionsMismatchException
+        if ripple_type not in (minesweeper.RippleTypes.Simple, minesweeper.RippleTypes.Recursive,
+                               minesweeper.RippleTypes.Queue):
+            raise ValueError('unknown ripple type %r' % (ripple_type,))
+
+        self.count, self.rows, self.columns = values.shape
+        self.values, self.shown = values, shown
+        self.rippleType = ripple_type
+        mines = values == minesweeper.Board.MINE
+        self.uncoveredCount = shown.sum(axis=(1, 2))
+        self.uncoveredMines = (shown & mines).sum(axis=(1, 2))
+        self.hiddenSafeCount = (~shown & ~mines).sum(axis=(1, 2))
+
+    @classmethod
+    def from_boards(cls, boards, ripple_type=None):
+        """Creates a batch from Board objects of the same dimensions.
+
+        Args:
+            boards: a non empty sequence of mined Board objects (flagged
+            cells are taken as hidden, the batch has no flags)
+            ripple_type: one of RippleTypes values, or None for the ripple
+            type of the first board
+
+        Returns:
+            a new GameBatch object (the boards are not altered)
+
+        Raises:
+            DimensionsMismatchException if the boards differ in size.
+            ValueError if a board has deferred mines (see Board.defer_mines).
+
+        """
+        rows, columns = boards[0].getRows(), boards[0].getColumns()
+        cells = rows * columns
+        values = numpy.empty((len(boards), cells), dtype=numpy.uint8)
+        shown = numpy.empty((len(boards), cells), dtype=numpy.uint8)
+        for (k, board) in enumerate(boards):
+            if board.getRows() != rows or board.getColumns() != columns:
+                raise minesweeper.DimensionsMismatchException
+            if board.getPendingMines():
+                raise ValueError('the mines of board %d are not placed yet' % k)
+            # the version 1 record is the header, the values, then the states
+            record = numpy.frombuffer(board.to_bytes(), dtype=numpy.uint8)
+            values[k] = record[-2 * cells:-cells]
+            shown[k] = record[-cells:]
+        if ripple_type is None:
+            ripple_type = boards[0].get_ripple_type()
+        shown = shown.reshape(-1, rows, columns) == minesweeper.Board.SHOWN
+        return cls(values.reshape(-1, rows, columns), shown, ripple_type)
+
+    @classmethod
+    def generate(cls, count, rows, columns, mines, seed=None, ripple_type=minesweeper.RippleTypes.Queue):
+        """Creates a batch of new games with randomly scattered mines.
+
+        The mines of all the games are drawn at once: every cell gets a
+        random key, and the cells with the smallest keys of each game get
+        the mines.
+
+        Args:
+            count: the number of games
+            rows, columns, mines: the configuration of every game
+            seed: optional seed of the NumPy random generator
+            ripple_type: one of RippleTypes values (see Board)
+
+        Returns:
+            a new GameBatch object
+
+        Raises:
+            SizeOutOfBoundException if the dimensions are illegal (large
+            mode limits), ScatterException if the number of mines is.
+
+        """
+        minesweeper.Board(rows, columns, large=True)
+        cells = rows * columns
+        if mines < 1 or mines > cells - 1:
+            raise minesweeper.ScatterException
+        keys = numpy.random.RandomState(seed).random_sample((count, cells))
+        chosen = numpy.argpartition(keys, mines - 1, axis=1)[:, :mines]
+        grid = numpy.zeros((count, cells), dtype=bool)
+        grid[numpy.arange(count)[:, None], chosen] = True
+        grid = grid.reshape(count, rows, columns)
+        values = _dilate_sum(grid)
+        values[grid] = minesweeper.Board.MINE
+        return cls(values, None, ripple_type)
+
+    def board(self, k):
+        """Returns the k-th game as a new Board object."""
+        Board = minesweeper.Board
+        header = Board._HEADER.pack(Board._MAGIC, Board._VERSION, self.rows, self.columns)
+        record = header + self.values[k].tobytes() + self.shown[k].astype(numpy.uint8).tobytes()
+        board = Board.from_bytes(record, large=True)
+        board.set_ripple_type(self.rippleType)
+        return board
+
+    def visible(self):
+        """Returns what the players see: a (K, rows, columns) int8 array.
+
+        Uncovered cells hold their value (0-8, or Board.MINE) and hidden
+        cells hold -1.
+        """
+        return numpy.where(self.shown, self.values.astype(numpy.int8), numpy.int8(-1))
+
+    def get_status(self):
+        """Returns the status of every game, as Game.get_status does.
+
+        Returns:
+            a (K,) int8 array of GameStatus values
+
+        """
+        status = numpy.full(self.count, minesweeper.GameStatus.InProgress, dtype=numpy.int8)
+        status[self.hiddenSafeCount == 0] = minesweeper.GameStatus.Win
+        status[self.uncoveredMines > 0] = minesweeper.GameStatus.Lose
+        status[self.uncoveredCount == 0] = minesweeper.GameStatus.NotStarted
+        return status
+
+    def get_metrics(self):
+        """Returns the difficulty metrics of every game, as Board.get_metrics does.
+
+        Returns:
+            a dict from the metric names (openings, isolated and 3bv) to
+            (K,) integer arrays (see metrics)
+
+        """
+        return metrics(self.values)
+
+    def make_moves(self, rows, columns, active=None):
+        """Makes one move in every (active) game, as Game.make_move does.
+
+        A move that Game.make_move would reject (indices out of bounds, or a
+        cell that is already uncovered) leaves its game unchanged and is
+        reported as illegal instead of raising.
+
+        Args:
+            rows: a (K,) integer array of the row of each move
+            columns: a (K,) integer array of the column of each move
+            active: optional (K,) boolean array of the games to move in (the
+            others are left unchanged)
+
+        Returns:
+            a (status, revealed, illegal) tuple: the (K,) status of every
+            game after the move (see get_status), the (K, rows, columns)
+            boolean mask of the cells each move uncovered, and the (K,)
+            boolean mask of the illegal moves
+
+        """
+        rows = numpy.asarray(rows, dtype=numpy.int64)
+        columns = numpy.asarray(columns, dtype=numpy.int64)
+        revealed = numpy.zeros(self.values.shape, dtype=bool)
+
+        legal = (rows >= 0) & (rows < self.rows) & (columns >= 0) & (columns < self.columns)
+        games = numpy.flatnonzero(legal)
+        legal[games] = ~self.shown[games, rows[games], columns[games]]
+        illegal = ~legal
+        if active is not None:
+            active = numpy.asarray(active, dtype=bool)
+            illegal &= active
+            legal &= active
+        games = numpy.flatnonzero(legal)
+        rows, columns = rows[games], columns[games]
+
+        self.shown[games, rows, columns] = True
+        revealed[games, rows, columns] = True
+        starts = self.values[games, rows, columns]
+        self.uncoveredCount[games] += 1
+        mined = starts == minesweeper.Board.MINE
+        self.uncoveredMines[games[mined]] += 1
+        self.hiddenSafeCount[games[~mined]] -= 1
+
+        empty = starts == 0
+        games, rows, columns = games[empty], rows[empty], columns[empty]
+        if games.size:
+            if self.rippleType == minesweeper.RippleTypes.Simple:
+                self._rippleSimple(games, rows, columns, revealed)
+            else:
+                self._flood(games, revealed)
+            ripple = revealed[games]
+            ripple[numpy.arange(games.size), rows, columns] = False
+            self.shown[games] |= ripple
+            uncovered = ripple.sum(axis=(1, 2))
+            self.uncoveredCount[games] += uncovered
+            self.hiddenSafeCount[games] -= uncovered
+        return self.get_status(), revealed, illegal
+
+    def _flood(self, games, revealed):
+        """Flood fills the ripples of the given games into revealed.
+
+        Each step uncovers the hidden neighbors of the cells the previous
+        step uncovered with value 0 (those are never mines), and games
+        whose ripple is over drop out of the following steps.
+        """
+        hidden = ~self.shown[games]
+        zero = self.values[games] == 0
+        index = numpy.arange(games.size)
+        found = revealed[games]
+        frontier = found & zero
+        while index.size:
+            grow = _dilate_any(frontier) & hidden[index] & ~found[index]
+            found[index] |= grow
+            frontier = grow & zero[index]
+            alive = frontier.any(axis=(1, 2))
+            index, frontier = index[alive], frontier[alive]
+        revealed[games] = found
+
+    def _rippleSimple(self, games, rows, columns, revealed):
+        """Ripples along the four arms of each start, like Board's Simple.
+
+        Each arm stops at the board edge or an uncovered cell, and after a
+        cell that has mines around it.
+        """
+        for (dr, dc) in ((-1, 0), (0, 1), (1, 0), (0, -1)):
+            r, c, alive = rows.copy(), columns.copy(), numpy.ones(games.size, dtype=bool)
+            for step in range(max(self.rows, self.columns)):
+                r += dr
+                c += dc
+                alive &= (r >= 0) & (r < self.rows) & (c >= 0) & (c < self.columns)
+                moving = numpy.flatnonzero(alive)
+                if not moving.size:
+                    break
+                cells = (games[moving], r[moving], c[moving])
+                stop = self.shown[cells]
+                alive[moving[stop]] = False
+                moving, cells = moving[~stop], (cells[0][~stop], cells[1][~stop], cells[2][~stop])
+                revealed[cells] = True
+                alive[moving[self.values[cells] != 0]] = False
+
+
+def metrics(values):
+    """Returns the difficulty metrics of a stack of boards, as Board.get_metrics does.
+
+    The numbers next to an empty cell are found with one dilation of the
+    empty cells. The openings are counted by labelling the empty cells of
+    all the boards together: every empty cell starts with its own index as
+    its label, and each step gives every empty cell, and the cell its label
+    points at, the smallest label around it (hooking). The labels are then
+    replaced by the labels of the cells they point at until none changes
+    (pointer jumping), so whole labelled areas merge in every step and long
+    openings take a few steps and not one per cell. The labelling stops
+    when no cell has a smaller label around it, and every opening is left
+    with one cell labelled with its own index.
+
+    Args:
+        values: a (K, rows, columns) integer array of cell values (0-8, or
+        Board.MINE), like GameBatch.values
+
+    Returns:
+        a dict from the metric names (openings, isolated and 3bv) to (K,)
+        integer arrays
+
+    """
+    values = numpy.asarray(values)
+    count, rows, columns = values.shape
+    empty = values == 0
+    numbers = (values != 0) & (values != minesweeper.Board.MINE)
+    isolated = (numbers & ~_dilate_any(empty)).sum(axis=(1, 2))
+
+    flat = _padded(empty).ravel()
+    size = flat.size
+    cells = numpy.flatnonzero(flat)
+    # the cells that are not empty (and the border) are labelled size, which
+    # is also the label of the extra last entry that size points at
+    labels = numpy.full(size + 1, size, dtype=numpy.int64)
+    labels[cells] = cells
+    width = columns + 2
+    offsets = [dr * width + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+    while True:
+        current = labels[cells]
+        smallest = current.copy()
+        for offset in offsets:
+            numpy.minimum(smallest, labels[cells + offset], out=smallest)
+        changed = numpy.flatnonzero(smallest < current)
+        if not changed.size:
+            break
+        # hook the labels of the changed cells to the smaller ones too, so
+        # whole labelled areas merge in one step
+        numpy.minimum.at(labels, current[changed], smallest[changed])
+        numpy.minimum.at(labels, cells[changed], smallest[changed])
+        while True:
+            jumped = labels[labels[cells]]
+            if numpy.array_equal(jumped, labels[cells]):
+                break
+            labels[cells] = jumped
+    roots = cells[labels[cells] == cells]
+    openings = numpy.bincount(roots // ((rows + 2) * width), minlength=count)
+    return {'openings': openings, 'isolated': isolated, '3bv': openings + isolated}
+
+
+def _padded(grid):
+    """Returns grid (K, rows, columns) with a border of zeros around each game."""
+    count, rows, columns = grid.shape
+    padded = numpy.zeros((count, rows + 2, columns + 2), dtype=grid.dtype)
+    padded[:, 1:-1, 1:-1] = grid
+    return padded
+
+
+def _dilate_any(grid):
+    """Returns the cells of grid and their neighbors, as a boolean array."""
+    rows, columns = grid.shape[1:]
+    padded = _padded(grid)
+    result = grid.copy()
+    for dr in (0, 1, 2):
+        for dc in (0, 1, 2):
+            if dr != 1 or dc != 1:
+                result |= padded[:, dr:dr + rows, dc:dc + columns]
+    return result
+
+
+def _dilate_sum(grid):
+    """Returns the number of neighbors of every cell that are set in grid."""
+    rows, columns = grid.shape[1:]
+    padded = _padded(grid.astype(numpy.uint8))
+    result = numpy.zeros(grid.shape, dtype=numpy.uint8)
+    for dr in (0, 1, 2):
+        for dc in (0, 1, 2):
+            if dr != 1 or dc != 1:
+                result += padded[:, dr:dr + rows, dc:dc + columns]
+    return result
@@ -0,0 +1,320 @@
+"""Benchmarks of the Board and Game hot paths.
+
+Every benchmark is run on a range of board sizes, from the regular 20x50
+limit up to large-mode boards. Each result is printed as one JSON object
+per line:
+    {"name": "put_mines[0.15]", "size": "20x50", "seconds": 0.00012}
+where seconds is the best time of the repeats. The results can be saved
+as a baseline and later compared against it, failing (exit status 1) if
+any benchmark got slower than the baseline by more than the tolerance
+(relative) plus the slack (absolute, so timer noise on sub-millisecond
+benchmarks doesn't fail the check).
+
+The times of a baseline only mean something on the machine that saved
+it, so there is no shared baseline: every machine that checks for
+regressions (a developer's, a build host) saves its own once, and passes
+it with --baseline. Without --baseline, the results are only printed. A
+benchmark missing from the baseline fails the check too, so the baseline
+must be saved again when benchmarks are added.
+
+Usage:
+    python benchmarks.py
+    python benchmarks.py --save-baseline baseline.json
+    python benchmarks.py --baseline baseline.json [--tolerance 0.25]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import minesweeper
+import solver
+import sparse
+
+try:
+    import batch
+except ImportError:
+    batch = None
+
+
+def _measure(setup, operation, repeats):
+    """Returns the best time of operation(setup()) over the given repeats.
+
+    setup is called before every repeat and is not timed, so benchmarks of
+    operations that alter the board start from a fresh board each time.
+    """
+    best = None
+    for i in range(repeats):
+        subject = setup()
+        start = timeit.default_timer()
+        operation(subject)
+        elapsed = timeit.default_timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _mined(rows, columns, density):
+    board = minesweeper.Board(rows, columns, True)
+    board.put_mines(max(1, min(int(rows * columns * density), rows * columns - 1)))
+    return board
+
+
+def _first_zero(board):
+    """Returns a hidden cell with no mines around it, or None."""
+    for r in range(board.getRows()):
+        for c in range(board.getColumns()):
+            if board.get_value(r, c) == '0':
+                return r, c
+    return None
+
+
+def _playing(rows, columns):
+    """Returns a game in progress on a board of the given size."""
+    game = minesweeper.Game(_mined(rows, columns, 0.15))
+    cell = _first_zero(game.board)
+    if cell is not None:
+        game.make_move(*cell)
+    return game
+
+
+def _flagged(rows, columns):
+    """Returns a game in progress with all of its mines flagged."""
+    game = _playing(rows, columns)
+    board = game.board
+    for r in range(rows):
+        for c in range(columns):
+            if board.get_value(r, c) == '*':
+                board.flag(r, c)
+    return game
+
+
+def _chord_all(game):
+    """Chords on every uncovered number, as a chording player would."""
+    for (r, c) in game.board.getUncoveredCells():
+        if game.board.get_value(r, c) != '0':
+            game.chord(r, c)
+
+
+def _rendered(rows, columns):
+    """Returns a game in progress whose menu was rendered before its last move."""
+    game = _playing(rows, columns)
+    game.getMenu()
+    board = game.board
+    for r in range(rows):
+        for c in range(columns):
+            if board.is_hidden(r, c) == 'H' and board.get_value(r, c) != '*':
+                game.make_move(r, c)
+                return game
+    return game
+
+
+def _sparse(density):
+    board = sparse.SparseBoard(sparse.SparseBoard.MAX_ROWS, sparse.SparseBoard.MAX_COLUMNS)
+    board.put_mines(int(board.getRows() * board.getColumns() * density), random.Random(0))
+    return minesweeper.Game(board)
+
+
+def _spawn(arguments, stdin=b''):
+    """Runs a new interpreter with the given arguments, next to minesweeper.py.
+
+    Raises:
+        CalledProcessError if the interpreter exits with an error.
+
+    """
+    directory = os.path.dirname(os.path.abspath(minesweeper.__file__))
+    subprocess.run([sys.executable] + arguments, input=stdin, cwd=directory,
+                   stdout=subprocess.DEVNULL, check=True)
+
+
+def benchmarks(rows, columns, directory):
+    """Returns the (name, setup, operation) benchmarks for one board size."""
+    filename = os.path.join(directory, 'board-%dx%d.txt' % (rows, columns))
+    _mined(rows, columns, 0.15).save_board(filename)
+
+    def lines():
+        with open(filename) as document:
+            document.readline()
+            document.readline()
+            return document.readlines()
+
+    cases = [
+        ('Board.__init__', lambda: None,
+         lambda subject: minesweeper.Board(rows, columns, True)),
+    ]
+    for density in (0.05, 0.15, 0.5, 0.9):
+        cases.append(('put_mines[%s]' % density,
+                      lambda: minesweeper.Board(rows, columns, True),
+                      lambda board, density=density: board.put_mines(
+                          max(1, min(int(rows * columns * density), rows * columns - 1)))))
+    cases += [
+        ('load_board', lambda: (minesweeper.Board(rows, columns, True), lines()),
+         lambda subject: subject[0].load_board(subject[1])),
+        ('save_board', lambda: _mined(rows, columns, 0.15),
+         lambda board: board.save_board(filename + '.saved')),
+    ]
+    names = ('Simple', 'Recursive', 'Queue')
+    for rippleType in (minesweeper.RippleTypes.Simple, minesweeper.RippleTypes.Recursive,
+                       minesweeper.RippleTypes.Queue):
+        # a board without mines is the worst case: the ripple covers it all
+        cases.append(('ripple_sequence[%s]' % names[rippleType],
+                      lambda rippleType=rippleType: minesweeper.Board(rows, columns, True, rippleType),
+                      lambda board: board.ripple_sequence(rows // 2, columns // 2)))
+    cases += [
+        ('Game.make_move', lambda: minesweeper.Game(minesweeper.Board(rows, columns, True)),
+         lambda game: game.make_move(rows // 2, columns // 2)),
+        ('Game.get_status', lambda: _playing(rows, columns),
+         lambda game: [game.get_status() for i in range(1000)]),
+        ('Game.chord', lambda: _flagged(rows, columns), _chord_all),
+        ('get_metrics', lambda: _mined(rows, columns, 0.15), lambda board: board.get_metrics()),
+    ]
+    if rows * columns <= minesweeper.Board.MAX_ROWS * minesweeper.Board.MAX_COLUMNS:
+        # the cost of a new game process: the interpreter, the imports (which
+        # must not include NumPy, it is imported lazily) and the first menu
+        cases.append(('startup[import]', lambda: None,
+                      lambda subject: _spawn(['-c', 'import sys, minesweeper; '
+                                                    'sys.exit("numpy" in sys.modules)'])))
+        cases.append(('startup[cli]', lambda: None,
+                      lambda subject: _spawn(['minesweeper.py', '-r', str(rows), '-c', str(columns),
+                                              '-m', '1'], b'2\n')))
+        cases.append(('Game.getMenu', lambda: _rendered(rows, columns),
+                      lambda game: [game.getMenu() for i in range(100)]))
+        # expert density (99 mines on 16x30); seeded so repeats time the same boards
+        cases.append(('generate_no_guess[0.2]', lambda: random.Random(0),
+                      lambda rng: [solver.generate_no_guess(rows, columns, int(rows * columns * 0.2),
+                                                            (rows // 2, columns // 2), rng)
+                                   for i in range(10)]))
+        if batch is not None:
+            # 256 games, the first move in the middle of each
+            cases.append(('GameBatch.make_moves[256]',
+                          lambda: batch.GameBatch.generate(256, rows, columns, int(rows * columns * 0.15), 0),
+                          lambda games: games.make_moves(games.count * [rows // 2], games.count * [columns // 2])))
+            cases.append(('batch.metrics[256]',
+                          lambda: batch.GameBatch.generate(256, rows, columns, int(rows * columns * 0.15), 0),
+                          lambda games: games.get_metrics()))
+    return cases
+
+
+def sparse_benchmarks():
+    """Returns the (name, setup, operation) benchmarks of SparseBoard.
+
+    They don't depend on the board sizes of the run: the board is always
+    the largest SparseBoard, and only the tiles around the move are used.
+    """
+    rows, columns = sparse.SparseBoard.MAX_ROWS, sparse.SparseBoard.MAX_COLUMNS
+    return [
+        # the first move of a huge sparse game: its tiles are drawn and counted
+        ('SparseBoard.make_move[0.15]', lambda: _sparse(0.15),
+         lambda game: game.make_move(rows // 2, columns // 2)),
+    ]
+
+
+def run(sizes, repeats):
+    """Runs every benchmark on every size and returns the results.
+
+    The SparseBoard benchmarks run once, on the largest SparseBoard size.
+    """
+    results = []
+    directory = tempfile.mkdtemp()
+    try:
+        suites = [('%dx%d' % (rows, columns), lambda rows=rows, columns=columns:
+                   benchmarks(rows, columns, directory)) for (rows, columns) in sizes]
+        suites.append(('%dx%d' % (sparse.SparseBoard.MAX_ROWS, sparse.SparseBoard.MAX_COLUMNS),
+                       sparse_benchmarks))
+        for (size, cases) in suites:
+            for (name, setup, operation) in cases():
+                seconds = _measure(setup, operation, repeats)
+                result = {'name': name, 'size': size, 'seconds': seconds}
+                print(json.dumps(result, sort_keys=True))
+                sys.stdout.flush()
+                results.append(result)
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+def compare(results, baseline, tolerance, slack=0.0):
+    """Returns the results that are slower than their baseline.
+
+    Args:
+        results: a list of results, as returned by run
+        baseline: a dict from '<name>@<size>' to seconds
+        tolerance: the allowed relative slowdown (0.25 = 25% slower)
+        slack: seconds allowed on top of the relative slowdown
+
+    Returns:
+        a list of (result, baseline seconds) tuples, where the baseline
+        seconds are None for the results missing from the baseline (which
+        count as regressions, so a stale baseline doesn't pass silently)
+
+    """
+    regressions = []
+    for result in results:
+        key = '%s@%s' % (result['name'], result['size'])
+        if key not in baseline:
+            regressions.append((result, None))
+        elif result['seconds'] > baseline[key] * (1 + tolerance) + slack:
+            regressions.append((result, baseline[key]))
+    return regressions
+
+
+def _size(text):
+    rows, columns = text.lower().split('x')
+    return int(rows), int(columns)
+
+
+def main():
+    """Runs the benchmarks according to the command line arguments.
+
+    The results are compared against the baseline file, if one was given
+    (see the module documentation). A missing baseline file is an error.
+
+    Returns:
+        the exit status: 1 if a regression against the baseline was found,
+        0 otherwise
+
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', "--sizes", type=lambda text: [_size(size) for size in text.split(',')],
+                        default=[(20, 50), (200, 200), (1000, 1000)])
+    parser.add_argument('-n', "--repeats", type=int, default=5)
+    parser.add_argument('-b', "--baseline")
+    parser.add_argument('-t', "--tolerance", type=float, default=0.25)
+    parser.add_argument("--slack", type=float, default=0.0005)
+    parser.add_argument("--save-baseline")
+    args = parser.parse_args()
+
+    baseline = args.baseline
+    if baseline is not None and not os.path.isfile(baseline):
+        parser.error('no baseline file %s (create it with --save-baseline)' % baseline)
+
+    results = run(args.sizes, args.repeats)
+
+    if args.save_baseline is not None:
+        saved = dict(('%s@%s' % (result['name'], result['size']), result['seconds'])
+                     for result in results)
+        with open(args.save_baseline, 'w') as document:
+            json.dump(saved, document, indent=1, sort_keys=True)
+
+    if baseline is not None:
+        with open(baseline) as document:
+            regressions = compare(results, json.load(document), args.tolerance, args.slack)
+        for (result, seconds) in regressions:
+            if seconds is None:
+                print('NO BASELINE %s@%s: %.6fs' % (result['name'], result['size'],
+                                                    result['seconds']))
+            else:
+                print('REGRESSION %s@%s: %.6fs (baseline %.6fs)'
+                      % (result['name'], result['size'], result['seconds'], seconds))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
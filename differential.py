@@ -0,0 +1,656 @@
+"""Differential testing of the optimized engines against the reference.
+
+reference.py keeps the original implementation of Board and Game as an
+oracle. This module generates random boards, board files and move
+sequences from a seed, runs them through the oracle and through each
+optimized path, and compares everything that can be observed:
+    load: load_board of (often malformed) lines: the exception raised
+        (including which one wins when both are possible), or the loaded
+        cells and the save_board text
+    ripple: ripple_sequence of every cell, in every ripple type
+    moves: the result of every make_move (its value or exception), the
+        cells and get_status after it, and getUncoveredCells at the end (the
+        cells of the oracle, in row-major order)
+    journal: undo, redo and rewind reproduce the states after each move
+    binary: the boards survive to_bytes/from_bytes in both formats
+    generation: put_mines (NumPy and pure Python paths, with excluded
+        cells) and defer_mines scatter the right mines, with the neighbor
+        counts of the oracle
+    batch: GameBatch.make_moves gives the cells and status of make_move
+        (only when NumPy is installed)
+    metrics: Board.get_metrics (and batch.metrics, when NumPy is
+        installed) count the openings the oracle's Queue ripple uncovers
+    sparse: a SparseBoard with the mines and states of the case gives the
+        ripple_sequence of every cell, and the cells and status after every
+        make_move, of the oracle
+    sparse_seeded: a SparseBoard whose mines are drawn per tile from a seed
+        (put at once, or deferred to the first move) has the mines and the
+        counts of a Board loaded with its mines, and gives the same
+        ripple_sequence of every cell, and the same results, cells, status
+        and flags after every make_move, flag and chord (checked against
+        the optimized Board, since the oracle has no flags and chords)
+A failing case is shrunk greedily, by dropping moves, mines, uncovered
+cells, rows, columns or characters for as long as it still fails, and the
+minimal case is printed with the mismatch, so it can be replayed.
+
+The extensions the oracle doesn't have (flags, deferred mines lines...) are
+not generated.
+
+Usage:
+    python differential.py [--cases 500] [--seed 0] [--check moves,load]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+import minesweeper
+import reference
+import sparse
+
+try:
+    import batch
+except ImportError:
+    batch = None
+
+RIPPLE_TYPES = (minesweeper.RippleTypes.Simple, minesweeper.RippleTypes.Recursive,
+                minesweeper.RippleTypes.Queue)
+
+
+class BoardCase(object):
+    """A board layout, its uncovered cells, a ripple type and moves to play."""
+
+    def __init__(self, rows, columns, mines, shown, ripple_type, moves):
+        self.rows, self.columns = rows, columns
+        self.mines, self.shown = tuple(mines), tuple(shown)
+        self.rippleType = ripple_type
+        self.moves = tuple(moves)
+
+    def lines(self):
+        """Returns the rows of the board in the load_board format."""
+        mines, shown = set(self.mines), set(self.shown)
+        lines = []
+        for r in range(self.rows):
+            pairs = []
+            for c in range(self.columns):
+                value = '*'
+                if (r, c) not in mines:
+                    value = str(len([(i, j) for i in (r - 1, r, r + 1) for j in (c - 1, c, c + 1)
+                                     if (i, j) in mines]))
+                pairs.append(value + ('S' if (r, c) in shown else 'H'))
+            lines.append(' '.join(pairs))
+        return lines
+
+    def shrinks(self):
+        """Yields smaller versions of the case."""
+        fields = (self.rows, self.columns, self.mines, self.shown, self.rippleType, self.moves)
+        for k in range(len(self.moves)):
+            yield BoardCase(*fields[:5] + (self.moves[:k] + self.moves[k + 1:],))
+        for k in range(len(self.mines)):
+            yield BoardCase(self.rows, self.columns, self.mines[:k] + self.mines[k + 1:],
+                            *fields[3:])
+        for k in range(len(self.shown)):
+            yield BoardCase(self.rows, self.columns, self.mines,
+                            self.shown[:k] + self.shown[k + 1:], *fields[4:])
+        if self.rows > 1:
+            yield self._crop(self.rows - 1, self.columns)
+        if self.columns > 2:
+            yield self._crop(self.rows, self.columns - 1)
+
+    def _crop(self, rows, columns):
+        inside = lambda cells: [(r, c) for (r, c) in cells if r < rows and c < columns]
+        return BoardCase(rows, columns, inside(self.mines), inside(self.shown), self.rippleType,
+                         self.moves)
+
+    def __repr__(self):
+        return ('BoardCase(%d, %d, mines=%r, shown=%r, ripple_type=%r, moves=%r)\nlines:\n    %s'
+                % (self.rows, self.columns, list(self.mines), list(self.shown), self.rippleType,
+                   list(self.moves), '\n    '.join(self.lines())))
+
+
+class LinesCase(object):
+    """The dimensions of a board and the lines given to load_board."""
+
+    def __init__(self, rows, columns, lines):
+        self.rows, self.columns, self.lines = rows, columns, tuple(lines)
+
+    def shrinks(self):
+        for k in range(len(self.lines)):
+            yield LinesCase(self.rows, self.columns, self.lines[:k] + self.lines[k + 1:])
+        for k in range(len(self.lines)):
+            line = self.lines[k]
+            for i in range(len(line)):
+                yield LinesCase(self.rows, self.columns,
+                                self.lines[:k] + (line[:i] + line[i + 1:],) + self.lines[k + 1:])
+
+    def __repr__(self):
+        return 'LinesCase(%d, %d, %r)' % (self.rows, self.columns, list(self.lines))
+
+
+class GenerationCase(object):
+    """A put_mines call: the board configuration, the seed and the excluded cells."""
+
+    def __init__(self, rows, columns, mines, seed, exclude, numpy):
+        self.rows, self.columns, self.mines = rows, columns, mines
+        self.seed, self.exclude, self.numpy = seed, tuple(exclude), numpy
+
+    def shrinks(self):
+        fields = (self.seed, self.exclude, self.numpy)
+        if self.mines > 1:
+            yield GenerationCase(self.rows, self.columns, self.mines - 1, *fields)
+        for k in range(len(self.exclude)):
+            yield GenerationCase(self.rows, self.columns, self.mines, self.seed,
+                                 self.exclude[:k] + self.exclude[k + 1:], self.numpy)
+
+    def __repr__(self):
+        return 'GenerationCase(%d, %d, %d, seed=%r, exclude=%r, numpy=%r)' % (
+            self.rows, self.columns, self.mines, self.seed, list(self.exclude), self.numpy)
+
+
+class SeededCase(object):
+    """A SparseBoard with seeded mines (see SparseBoard.put_mines) and moves.
+
+    The mines are put at once, or deferred to the first move. Every move is
+    ('M', r, c) for make_move, ('F', r, c) for flag or ('C', r, c) for a
+    chord, which first uncovers the cell if it is hidden and safe, and
+    flags the hidden mines around it, so most chords uncover cells.
+    """
+
+    def __init__(self, rows, columns, mines, seed, deferred, ripple_type, moves):
+        self.rows, self.columns, self.mines = rows, columns, mines
+        self.seed, self.deferred, self.rippleType = seed, deferred, ripple_type
+        self.moves = tuple(moves)
+
+    def shrinks(self):
+        fields = (self.seed, self.deferred, self.rippleType)
+        first = 1 if self.deferred else 0
+        for k in range(first, len(self.moves)):
+            yield SeededCase(self.rows, self.columns, self.mines, *fields +
+                             (self.moves[:k] + self.moves[k + 1:],))
+        if self.mines > 1:
+            yield SeededCase(self.rows, self.columns, self.mines - 1, *fields + (self.moves,))
+        # the first move of deferred mines must stay on the board
+        (r, c) = self.moves[0][1:] if self.deferred else (-1, -1)
+        if self.rows > 1 and self.mines < (self.rows - 1) * self.columns and r < self.rows - 1:
+            yield SeededCase(self.rows - 1, self.columns, self.mines, *fields + (self.moves,))
+        if self.columns > 2 and self.mines < self.rows * (self.columns - 1) and c < self.columns - 1:
+            yield SeededCase(self.rows, self.columns - 1, self.mines, *fields + (self.moves,))
+
+    def __repr__(self):
+        return 'SeededCase(%d, %d, %d, seed=%r, deferred=%r, ripple_type=%r, moves=%r)' % (
+            self.rows, self.columns, self.mines, self.seed, self.deferred, self.rippleType,
+            list(self.moves))
+
+
+def random_board_case(rng):
+    rows, columns = rng.randint(1, 8), rng.randint(2, 10)
+    cells = [(r, c) for r in range(rows) for c in range(columns)]
+    density = rng.choice((0.0, 0.05, 0.15, 0.3, 0.6))
+    mines = [cell for cell in cells if rng.random() < density]
+    shown = [cell for cell in cells if rng.random() < rng.choice((0.0, 0.0, 0.1, 0.3))]
+    moves = [(rng.randint(-1, rows), rng.randint(-1, columns)) for k in range(rng.randint(0, 12))]
+    return BoardCase(rows, columns, mines, shown, rng.choice(RIPPLE_TYPES), moves)
+
+
+def random_lines_case(rng):
+    case = random_board_case(rng)
+    lines = case.lines()
+    for k in range(rng.randint(0, 3)):
+        mutation = rng.randrange(7)
+        i = rng.randrange(len(lines) + 1)
+        if mutation == 0:
+            lines.insert(i, rng.choice(('', ' ', '\t', ' \t ')))
+        elif i == len(lines):
+            continue
+        elif mutation == 1:
+            lines[i] = rng.choice((' ', '\t', '  ')) + lines[i] + rng.choice(('', ' ', '\t\t'))
+        elif mutation == 2:
+            j = rng.randrange(len(lines[i]) + 1)
+            lines[i] = lines[i][:j] + rng.choice('0123456789*HSX \t') + lines[i][j + 1:]
+        elif mutation == 3:
+            j = rng.randrange(len(lines[i]) + 1)
+            lines[i] = lines[i][:j] + lines[i][j + 1:]
+        elif mutation == 4:
+            lines.insert(i, lines[i])
+        elif mutation == 5:
+            del lines[i]
+        else:
+            j = rng.randrange(len(lines[i]) + 1)
+            lines[i] = lines[i][:j] + ' ' + lines[i][j:]
+    rows = max(1, case.rows + rng.choice((0, 0, 0, -1, 1)))
+    columns = max(2, case.columns + rng.choice((0, 0, 0, -1, 1)))
+    return LinesCase(rows, columns, lines)
+
+
+def random_generation_case(rng):
+    rows, columns = rng.randint(1, 12), rng.randint(2, 20)
+    cells = rows * columns
+    exclude = set((rng.randrange(rows), rng.randrange(columns)) for k in range(rng.randint(0, 3)))
+    exclude = sorted(exclude)[:cells - 2]
+    mines = rng.randint(1, cells - 1 - len(exclude))
+    return GenerationCase(rows, columns, mines, rng.randrange(2 ** 32), exclude, rng.random() < 0.5)
+
+
+def random_seeded_case(rng):
+    rows, columns = rng.randint(1, 12), rng.randint(2, 14)
+    cells = rows * columns
+    density = rng.choice((0.05, 0.15, 0.3, 0.6))
+    mines = max(1, min(int(cells * density), cells - 1))
+    moves = [(rng.choice('MMMFC'), rng.randint(-1, rows), rng.randint(-1, columns))
+             for k in range(rng.randint(0, 15))]
+    deferred = rng.random() < 0.5
+    if deferred:
+        moves.insert(0, ('M', rng.randrange(rows), rng.randrange(columns)))
+    return SeededCase(rows, columns, mines, rng.randrange(2 ** 32), deferred,
+                      rng.choice(RIPPLE_TYPES), moves)
+
+
+def _cells(board):
+    """Returns what is observable of a board: every cell's value and state."""
+    return tuple((board.get_value(r, c), board.is_hidden(r, c))
+                 for r in range(board.getRows()) for c in range(board.getColumns()))
+
+
+def _outcome(function, *args):
+    """Returns ('ok', result) or ('raised', the exception class name)."""
+    try:
+        return ('ok', function(*args))
+    except Exception as error:
+        return ('raised', type(error).__name__)
+
+
+def _boards(case):
+    """Returns the reference and optimized boards of a BoardCase."""
+    lines = case.lines()
+    expected = reference.Board(case.rows, case.columns, case.rippleType)
+    expected.load_board(lines)
+    actual = minesweeper.Board(case.rows, case.columns, ripple_type=case.rippleType)
+    actual.load_board(lines)
+    return expected, actual
+
+
+def _saved(board, directory):
+    filename = os.path.join(directory, 'board')
+    board.save_board(filename)
+    with open(filename) as document:
+        return document.read()
+
+
+def check_load(case):
+    expected = reference.Board(case.rows, case.columns)
+    actual = minesweeper.Board(case.rows, case.columns)
+    wanted = _outcome(expected.load_board, case.lines)
+    got = _outcome(actual.load_board, iter(case.lines))
+    if wanted != got:
+        return 'load_board: expected %r, got %r' % (wanted, got)
+    if wanted[0] == 'ok':
+        if _cells(expected) != _cells(actual):
+            return 'load_board: the cells differ'
+        directory = tempfile.mkdtemp()
+        try:
+            if _saved(expected, directory) != _saved(actual, directory):
+                return 'save_board: the text differs'
+        finally:
+            shutil.rmtree(directory)
+    return None
+
+
+def check_ripple(case):
+    expected, actual = _boards(case)
+    for r in range(case.rows):
+        for c in range(case.columns):
+            wanted, got = expected.ripple_sequence(r, c), actual.ripple_sequence(r, c)
+            if wanted != got:
+                return 'ripple_sequence(%d, %d): expected %r, got %r' % (r, c, wanted, got)
+    return None
+
+
+def _play(case, game=None):
+    """Plays the moves of a case on the oracle.
+
+    Args:
+        case: the case to play
+        game: the reference.Game to play on (default: a new one on the board
+        of the case)
+
+    Returns:
+        the list of (outcome, cells, status) after every move, preceded by
+        (None, cells, status) of the initial board
+
+    """
+    game = game or reference.Game(_boards(case)[0])
+    states = [(None, _cells(game.board), game.get_status())]
+    for (r, c) in case.moves:
+        outcome = _outcome(game.make_move, r, c)
+        states.append((outcome, _cells(game.board), game.get_status()))
+    return states
+
+
+def check_moves(case):
+    oracle = reference.Game(_boards(case)[0])
+    expected = _play(case, oracle)
+    game = minesweeper.Game(_boards(case)[1])
+    got = [(None, _cells(game.board), game.get_status())]
+    for (r, c) in case.moves:
+        got.append((_outcome(game.make_move, r, c), _cells(game.board), game.get_status()))
+    for (k, (wanted, state)) in enumerate(zip(expected, got)):
+        if wanted != state:
+            move = case.moves[k - 1] if k else None
+            return 'after move %d %r: expected %r, got %r' % (k, move, wanted, state)
+    return _compareUncovered(oracle.board, game.board)
+
+
+def _compareUncovered(expected, actual):
+    """Compares getUncoveredCells, which lists the oracle's cells in row-major order.
+
+    The oracle lists the cells in the order they were uncovered, the
+    optimized boards in row-major order (see minesweeper.Board).
+    """
+    wanted, got = sorted(expected.getUncoveredCells()), actual.getUncoveredCells()
+    if wanted != got:
+        return 'getUncoveredCells: expected %r, got %r' % (wanted, got)
+    return None
+
+
+def check_journal(case):
+    expected = [state for (outcome, state, status) in _play(case)
+                if outcome is None or outcome[0] == 'ok']
+    game = minesweeper.Game(_boards(case)[1])
+    for (r, c) in case.moves:
+        _outcome(game.make_move, r, c)
+    for position in [0, len(expected) - 1] + list(range(len(expected) - 2, -1, -1)):
+        game.rewind(position)
+        if _cells(game.board) != expected[position]:
+            return 'rewind(%d): the cells differ' % position
+    return None
+
+
+def check_binary(case):
+    expected, actual = _boards(case)
+    status = reference.Game(expected).get_status()
+    for compact in (False, True):
+        board = minesweeper.Board.from_bytes(actual.to_bytes(compact))
+        if _cells(board) != _cells(expected):
+            return 'from_bytes(to_bytes(compact=%r)): the cells differ' % compact
+        if minesweeper.Game(board).get_status() != status:
+            return 'from_bytes(to_bytes(compact=%r)): the status differs' % compact
+    return None
+
+
+def _counted(board):
+    """Returns the lines of a board, the numbers counted by the oracle."""
+    lines = board._formatRows().splitlines()
+    expected = reference.Board(board.getRows(), board.getColumns())
+    expected.load_board(lines)
+    for (r, c) in list(expected.board.keys()):
+        if expected.board[(r, c)] != '*':
+            expected.updateCell(r, c)
+    return _cells(expected)
+
+
+def check_generation(case):
+    if case.numpy and minesweeper._numpy() is None:
+        return None
+    board = minesweeper.Board(case.rows, case.columns)
+    rng = None if case.numpy else random.Random(case.seed)
+    if case.numpy:
+        minesweeper._numpy().random.seed(case.seed)
+    board.put_mines(case.mines, rng, case.exclude)
+    cells = _cells(board)
+    if len([1 for (value, state) in cells if value == '*']) != case.mines:
+        return 'put_mines: wrong number of mines'
+    if any(board.get_value(r, c) == '*' for (r, c) in case.exclude):
+        return 'put_mines: a mine on an excluded cell'
+    if cells != _counted(board):
+        return 'put_mines: the numbers differ from the oracle counts'
+
+    deferred = minesweeper.Board(case.rows, case.columns)
+    deferred.defer_mines(case.mines, rng=random.Random(case.seed))
+    first = case.exclude[0] if case.exclude else (0, 0)
+    deferred.uncover(*first)
+    if deferred.get_value(*first) == '*':
+        return 'defer_mines: the first uncover hit a mine'
+    if _cells(deferred) != _counted(deferred):
+        return 'defer_mines: the numbers differ from the oracle counts'
+    return None
+
+
+def check_batch(case):
+    if batch is None:
+        return None
+    expected = _play(case)
+    games = batch.GameBatch.from_boards([_boards(case)[1]])
+    for (k, (r, c)) in enumerate(case.moves):
+        status, revealed, illegal = games.make_moves([r], [c])
+        (outcome, cells, wanted) = expected[k + 1]
+        if bool(illegal[0]) != (outcome[0] == 'raised'):
+            return 'move %d %r: expected %r, illegal=%r' % (k + 1, (r, c), outcome, bool(illegal[0]))
+        if _cells(games.board(0)) != cells or status[0] != wanted:
+            return 'after move %d %r: the cells or the status differ' % (k + 1, (r, c))
+    return None
+
+
+def _metrics(case):
+    """Returns the metrics of a case, from the ripples of the oracle.
+
+    Every empty cell that no earlier opening uncovered starts a new one,
+    made of the cell and its Queue ripple sequence on the covered board.
+    """
+    board = _boards(case)[0]
+    board.uncovered, board.rippleType = [], minesweeper.RippleTypes.Queue
+    opened, openings = set(), 0
+    for r in range(case.rows):
+        for c in range(case.columns):
+            if board.get_value(r, c) == '0' and (r, c) not in opened:
+                openings += 1
+                opened.add((r, c))
+                opened.update(board.ripple_sequence(r, c))
+    isolated = len([(r, c) for r in range(case.rows) for c in range(case.columns)
+                    if board.get_value(r, c) not in '0*' and (r, c) not in opened])
+    return {'openings': openings, 'isolated': isolated, '3bv': openings + isolated}
+
+
+def check_metrics(case):
+    expected = _metrics(case)
+    actual = _boards(case)[1]
+    got = actual.get_metrics()
+    if got != expected:
+        return 'get_metrics: expected %r, got %r' % (expected, got)
+    if batch is not None:
+        got = batch.GameBatch.from_boards([actual]).get_metrics()
+        got = dict((name, int(counts[0])) for (name, counts) in got.items())
+        if got != expected:
+            return 'batch.metrics: expected %r, got %r' % (expected, got)
+    return None
+
+
+class _SmallTiles(sparse.SparseBoard):
+    """A SparseBoard of 4x4 tiles, so the small cases cross tiles too."""
+    SHIFT = 2
+    TILE = 1 << SHIFT
+    _MASK = TILE - 1
+
+
+def check_sparse(case):
+    expected, actual = _boards(case)
+    board = _SmallTiles.from_board(actual)
+    for r in range(case.rows):
+        for c in range(case.columns):
+            wanted, got = expected.ripple_sequence(r, c), board.ripple_sequence(r, c)
+            if wanted != got:
+                return 'ripple_sequence(%d, %d): expected %r, got %r' % (r, c, wanted, got)
+    oracle = reference.Game(_boards(case)[0])
+    expected = _play(case, oracle)
+    game = minesweeper.Game(board)
+    got = [(None, _cells(game.board), game.get_status())]
+    for (r, c) in case.moves:
+        got.append((_outcome(game.make_move, r, c), _cells(game.board), game.get_status()))
+    for (k, (wanted, state)) in enumerate(zip(expected, got)):
+        if wanted != state:
+            move = case.moves[k - 1] if k else None
+            return 'after move %d %r: expected %r, got %r' % (k, move, wanted, state)
+    return _compareUncovered(oracle.board, game.board)
+
+
+def _dense(case, board):
+    """Returns a Board with the mines of a SparseBoard, all of its cells hidden.
+
+    Only the mines are read from the SparseBoard: the values of the Board
+    are counted by BoardCase, so the counts of the two are compared too.
+    """
+    mines = [(r, c) for r in range(case.rows) for c in range(case.columns)
+             if board.get_value(r, c) == '*']
+    dense = minesweeper.Board(case.rows, case.columns, True, case.rippleType)
+    dense.load_board(BoardCase(case.rows, case.columns, mines, [], case.rippleType, []).lines())
+    return dense
+
+
+def _seededMove(case, game, move, dense):
+    """Plays a move of a SeededCase on a game, whose mines are those of dense."""
+    (event, r, c) = move
+    if event == 'M':
+        return _outcome(game.make_move, r, c)
+    if event == 'F':
+        return _outcome(game.flag, r, c)
+    around = [(i, j) for i in (r - 1, r, r + 1) for j in (c - 1, c, c + 1)
+              if 0 <= i < case.rows and 0 <= j < case.columns]
+    board = game.board
+    if (r, c) in around and board.is_hidden(r, c) == 'H' and not board.is_flagged(r, c):
+        if dense.get_value(r, c) != '*':
+            game.make_move(r, c)
+    for (i, j) in around:
+        hidden = board.is_hidden(i, j) == 'H' and not board.is_flagged(i, j)
+        if hidden and dense.get_value(i, j) == '*':
+            game.flag(i, j)
+    return _outcome(game.chord, r, c)
+
+
+def check_sparse_seeded(case):
+    board = _SmallTiles(case.rows, case.columns, case.rippleType)
+    rng = random.Random(case.seed)
+    moves = case.moves
+    if case.deferred:
+        board.defer_mines(case.mines, rng=rng)
+        if board.getPendingMines() != case.mines:
+            return 'getPendingMines: expected %d, got %d' % (case.mines, board.getPendingMines())
+        board.uncover(*moves[0][1:])
+    else:
+        board.put_mines(case.mines, rng)
+    dense = _dense(case, board)
+    mines = len([(r, c) for r in range(case.rows) for c in range(case.columns)
+                 if dense.get_value(r, c) == '*'])
+    if mines != case.mines:
+        return 'the layout has %d mines, expected %d' % (mines, case.mines)
+    if case.deferred:
+        dense.uncover(*moves[0][1:])
+        if dense.get_value(*moves[0][1:]) == '*':
+            return 'the first move %r hit a mine' % (moves[0],)
+        if dense.ripple_sequence(*moves[0][1:]) != board.ripple_sequence(*moves[0][1:]):
+            return 'ripple_sequence%r differs' % (moves[0][1:],)
+        moves = moves[1:]
+    else:
+        for r in range(case.rows):
+            for c in range(case.columns):
+                wanted, got = dense.ripple_sequence(r, c), board.ripple_sequence(r, c)
+                if wanted != got:
+                    return 'ripple_sequence(%d, %d): expected %r, got %r' % (r, c, wanted, got)
+
+    expected, actual = minesweeper.Game(dense), minesweeper.Game(board)
+    for (k, move) in enumerate(moves):
+        wanted = (_seededMove(case, expected, move, dense), _cells(expected.board),
+                  expected.get_status(), expected.board.getFlaggedCells())
+        got = (_seededMove(case, actual, move, dense), _cells(actual.board), actual.get_status(),
+               actual.board.getFlaggedCells())
+        if wanted != got:
+            return 'after move %d %r: expected %r, got %r' % (k, move, wanted, got)
+    if expected.board.getUncoveredCells() != actual.board.getUncoveredCells():
+        return 'getUncoveredCells differs'
+    return None
+
+
+# check name -> (case generator, check function)
+CHECKS = {
+    'load': (random_lines_case, check_load),
+    'ripple': (random_board_case, check_ripple),
+    'moves': (random_board_case, check_moves),
+    'journal': (random_board_case, check_journal),
+    'binary': (random_board_case, check_binary),
+    'generation': (random_generation_case, check_generation),
+    'batch': (random_board_case, check_batch),
+    'metrics': (random_board_case, check_metrics),
+    'sparse': (random_board_case, check_sparse),
+    'sparse_seeded': (random_seeded_case, check_sparse_seeded),
+}
+
+
+def _failure(check, case):
+    """Returns the mismatch of a case, counting crashes as mismatches."""
+    try:
+        return check(case)
+    except Exception as error:
+        return 'crashed: %s: %s' % (type(error).__name__, error)
+
+
+def shrink(check, case, failure):
+    """Returns the smallest case found that still fails, and its failure."""
+    shrunk = True
+    while shrunk:
+        shrunk = False
+        for smaller in case.shrinks():
+            result = _failure(check, smaller)
+            if result is not None:
+                case, failure, shrunk = smaller, result, True
+                break
+    return case, failure
+
+
+def run(names, cases, seed):
+    """Runs the given checks on cases random cases each.
+
+    Returns:
+        a list of (check name, minimal case, failure) tuples, at most one
+        per check
+
+    """
+    failures = []
+    for name in names:
+        generate, check = CHECKS[name]
+        rng = random.Random('%s:%s' % (seed, name))
+        for k in range(cases):
+            case = generate(rng)
+            failure = _failure(check, case)
+            if failure is not None:
+                failures.append((name,) + shrink(check, case, failure))
+                break
+    return failures
+
+
+def main():
+    """Runs the checks according to the command line arguments.
+
+    Returns:
+        the exit status: 1 if a mismatch was found, 0 otherwise
+
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', "--cases", type=int, default=500)
+    parser.add_argument('-s', "--seed", default='0')
+    parser.add_argument('-c', "--check", type=lambda text: text.split(','),
+                        default=sorted(CHECKS))
+    args = parser.parse_args()
+
+    for name in args.check:
+        if name not in CHECKS:
+            parser.error('unknown check: %s' % name)
+    failures = run(args.check, args.cases, args.seed)
+    for (name, case, failure) in failures:
+        print('FAILED %s: %s\n%r' % (name, failure, case))
+    if not failures:
+        print('%d checks passed %d cases each' % (len(args.check), args.cases))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
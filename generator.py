@@ -0,0 +1,225 @@
+"""Seeded, reproducible bulk generation of minesweeper boards.
+
+Every board is drawn from its own seed, derived from the seed of the run
+and the index of the board, so a run produces the same boards regardless
+of the number of worker processes. The boards are written either as text
+files in the save_board format (one file per board, in a directory), or
+as a single stream of compact binary board records (see Board.to_bytes).
+Given a first move, the boards are generated so they can be cleared from
+it without guessing (see solver.generate_no_guess).
+"""
+import argparse
+import multiprocessing
+import os
+import random
+
+import minesweeper
+import solver
+
+
+# boards per run: the index takes the low 32 bits of the board seeds
+MAX_BOARDS = 1 << 32
+
+
+def board_seed(seed, index):
+    """Returns the seed of the index-th board of a run seeded with seed.
+
+    The seed of the run takes the high bits and the index the low 32 bits,
+    so different (seed, index) pairs get different seeds as long as both
+    are in range.
+
+    Raises:
+        ValueError if seed is negative, or index is not in 0..MAX_BOARDS-1
+        (a negative seed, or a larger index, would give the seed of another
+        board)
+
+    """
+    if seed < 0:
+        raise ValueError('negative seed: %r' % (seed,))
+    if index < 0 or index >= MAX_BOARDS:
+        raise ValueError('board index out of range: %r' % (index,))
+    return (seed << 32) + index
+
+
+def board_path(directory, index):
+    """Returns the path of the index-th board text file in directory."""
+    return os.path.join(directory, 'board-%08d.txt' % index)
+
+
+def generate_board(rows, columns, mines, seed, index, large=False, first=None):
+    """Generates the index-th board of a run seeded with seed.
+
+    Args:
+        rows: the number of rows in the board
+        columns: the number of columns in the board
+        mines: the number of mines to scatter
+        seed: the seed of the run (integer)
+        index: the index of the board in the run
+        large: create the board in large mode (see Board)
+        first: optional (r,c) first move the board must be solvable from,
+        without guessing
+
+    Returns:
+        a new Board object, with its mines scattered
+
+    Raises:
+        SizeOutOfBoundException, ScatterException (generated by Board or by
+        solver.generate_no_guess), IllegalIndicesException if first is out
+        of bounds, ValueError if seed or index is out of range (see
+        board_seed)
+
+    """
+    rng = random.Random(board_seed(seed, index))
+    if first is not None:
+        return solver.generate_no_guess(rows, columns, mines, first, rng, large)
+    board = minesweeper.Board(rows, columns, large)
+    board.put_mines(mines, rng)
+    return board
+
+
+def _generate_chunk(job):
+    """Generates boards start..stop-1 of a run, in a worker process.
+
+    Text boards are saved by the worker itself. Binary boards are returned
+    as one string of records, so they can be written in order.
+    """
+    rows, columns, mines, seed, large, first, start, stop, directory = job
+    records = []
+    for index in range(start, stop):
+        board = generate_board(rows, columns, mines, seed, index, large, first)
+        if directory is None:
+            records.append(board.to_bytes(compact=True))
+        else:
+            board.save_board(board_path(directory, index))
+    return b''.join(records)
+
+
+def generate_boards(rows, columns, mines, count, seed, output, binary=False,
+                    workers=None, chunk_size=256, large=False, first=None):
+    """Generates count boards and streams them to disk.
+
+    The boards are generated in chunks across a pool of worker processes
+    and written as soon as their chunk is ready, so memory use depends on
+    the chunk size and not on count.
+
+    Args:
+        rows, columns, mines: the configuration of the boards
+        count: the number of boards to generate
+        seed: the seed of the run (integer)
+        output: a directory for text boards (created if needed), or a file
+        name for the binary stream
+        binary: write a binary stream instead of text files
+        workers: the number of worker processes (default: one per CPU); with
+        a single worker the boards are generated in this process
+        chunk_size: the number of boards per job sent to a worker
+        large: create the boards in large mode (see Board)
+        first: optional (r,c) first move the boards must be solvable from,
+        without guessing
+
+    Returns:
+        None
+
+    Raises:
+        SizeOutOfBoundException, ScatterException (generated by Board),
+        IllegalIndicesException if first is out of bounds, ValueError if
+        seed is negative or count is larger than MAX_BOARDS (see
+        board_seed), IOError in case of any file/IO related problem
+
+    """
+    minesweeper.Board(rows, columns, large)
+    board_seed(seed, max(count - 1, 0))
+    if mines < 1 or mines > rows * columns - 1:
+        raise minesweeper.ScatterException
+    if first is not None and not (0 <= first[0] < rows and 0 <= first[1] < columns):
+        raise minesweeper.IllegalIndicesException
+
+    directory = None
+    if not binary:
+        directory = output
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+    jobs = ((rows, columns, mines, seed, large, first, start, min(start + chunk_size, count),
+             directory)
+            for start in range(0, count, chunk_size))
+
+    pool = None
+    if workers == 1:
+        results = (_generate_chunk(job) for job in jobs)
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap(_generate_chunk, jobs)
+    try:
+        if binary:
+            with open(output, 'wb') as stream:
+                for records in results:
+                    stream.write(records)
+        else:
+            for records in results:
+                pass
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def read_boards(filename, large=False):
+    """Yields the boards of a binary stream written by generate_boards.
+
+    Raises:
+        BoardFormatException, DimensionsMismatchException if a record is
+        malformed (see Board.from_bytes), IOError in case of any file/IO
+        related problem
+
+    """
+    with open(filename, 'rb') as stream:
+        board = minesweeper.Board.from_stream(stream, large)
+        while board is not None:
+            yield board
+            board = minesweeper.Board.from_stream(stream, large)
+
+
+def main():
+    """Generates boards according to the command line arguments.
+
+    Prints "Illegal rows/columns/mines values" if the board configuration is
+    illegal (or no board without guessing was found), "Illegal first move"
+    if the first move is out of bounds, "Illegal seed/count values" if the
+    seed is negative or the count is too large (see board_seed), and
+    "Generation failed" in case of a file/IO problem.
+
+    Returns:
+        None
+
+    Raises:
+        Nothing
+
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', "--rows", type=int, required=True)
+    parser.add_argument('-c', "--columns", type=int, required=True)
+    parser.add_argument('-m', "--mines", type=int, required=True)
+    parser.add_argument('-n', "--count", type=int, default=1)
+    parser.add_argument('-s', "--seed", type=int, default=0)
+    parser.add_argument('-o', "--output", required=True)
+    parser.add_argument('-b', "--binary", action='store_true')
+    parser.add_argument('-w', "--workers", type=int, default=None)
+    parser.add_argument('-l', "--large", action='store_true')
+    parser.add_argument('-f', "--first", type=int, nargs=2, metavar=('ROW', 'COLUMN'))
+    args = parser.parse_args()
+
+    try:
+        generate_boards(args.rows, args.columns, args.mines, args.count, args.seed,
+                        args.output, args.binary, args.workers, large=args.large,
+                        first=args.first and tuple(args.first))
+    except (minesweeper.SizeOutOfBoundException, minesweeper.ScatterException):
+        print('Illegal rows/columns/mines values')
+    except minesweeper.IllegalIndicesException:
+        print('Illegal first move')
+    except ValueError:
+        print('Illegal seed/count values')
+    except (IOError, OSError):
+        print('Generation failed')
+
+
+if __name__ == '__main__':
+    main()
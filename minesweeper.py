@@ -1,5 +1,31 @@
 import argparse  # mandatory
-import random
+import array
+import binascii
+import os
+import re
+import struct
+import sys
+from collections import deque
+
+
+def _numpy():
+    """Returns the numpy module, or None if it is not installed.
+
+    NumPy is imported on first use, by the first board generation, since
+    importing it takes longer than starting the whole game without it. The
+    outcome is kept on the function, so a missing NumPy is looked up once.
+    The other modules that the game doesn't need to start (random, tempfile
+    and mmap) are imported by the methods that use them, for the same
+    reason.
+    """
+    if not hasattr(_numpy, 'module'):
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy.module = numpy
+    return _numpy.module
+
 
 class GameStatus(object):
     """Enum of possible Game statuses."""
@@ -13,6 +39,41 @@ class RippleTypes(object):
     Simple, Recursive, Queue = range(3)
 
 
+class CellSequence(object):
+    """A sequence of (r,c) cells, stored as flat indices (r*columns + c).
+
+    The cells a move uncovers can cover most of a large board, and a list
+    of (r,c) tuples costs over a hundred bytes per cell, so the ripples
+    collect flat indices in an array and the journal of Game keeps them in
+    this form. Iterating yields the (r,c) tuples one at a time.
+    """
+    __slots__ = ('columns', 'indices')
+
+    def __init__(self, columns, indices):
+        """Initializes a sequence of the cells at indices of a board.
+
+        Args:
+            columns: the number of columns of the board
+            indices: an array.array of the flat indices of the cells
+
+        """
+        self.columns, self.indices = columns, indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        columns = self.columns
+        return (divmod(i, columns) for i in self.indices)
+
+    def __reversed__(self):
+        columns = self.columns
+        return (divmod(i, columns) for i in reversed(self.indices))
+
+    def __getitem__(self, k):
+        return divmod(self.indices[k], self.columns)
+
+
 class SizeOutOfBoundException(Exception):
     pass
 
@@ -38,9 +99,83 @@ class IllegalMoveException(Exception):
 
 
 class Board(object):
-    """Represents a board of minesweeper game and its current progress."""
-
-    def __init__(self, rows, columns):
+    """Represents a board of minesweeper game and its current progress.
+
+    The cells are stored in two flat arrays in row-major order (the cell at
+    (r, c) is at index r*columns + c): one holds the value of each cell (0-8,
+    or MINE for a mine) and the other holds its state (HIDDEN, SHOWN, or
+    FLAGGED for a hidden cell the player marked as a mine). A cell costs two
+    bytes and every lookup is a plain array access. The neighbors of a cell
+    are read from a table of offsets built once per board, indexed by which
+    edges of the board the cell is on (see _neighbors).
+
+    Boards are limited to MAX_ROWS x MAX_COLUMNS unless they are created in
+    large mode, which allows up to LARGE_MAX_ROWS x LARGE_MAX_COLUMNS. The
+    budgets that make large boards practical are (test_budgets.py checks
+    them):
+        memory: 2 bytes per cell (200MB for a 10000x10000 board), plus
+            a 1 byte per cell visited bitmap allocated by the first ripple.
+            A ripple collects its cells as 4 byte flat indices (see
+            ripple_cells), and the Recursive ripple keeps a stack of up to
+            5 bytes per cell of the region, so a Game.make_move that
+            uncovers the whole board peaks at about 12 bytes per cell, and
+            keeps 7 (its journal entry included). The methods that return
+            (r,c) tuples (ripple_sequence, chord_sequence,
+            getUncoveredCells...) and the render caches of Game.getMenu cost
+            over 100 bytes per cell they hold: they are meant for small
+            regions.
+        put_mines: O(cells) vectorized NumPy work when NumPy is installed;
+            otherwise O(cells) to allocate and O(mines) Python steps to
+            scatter and count neighbors (expected less than two random draws
+            per mine).
+        ripple_sequence: O(region), the number of cells in the sequence
+            (a few microseconds per cell).
+        get_metrics: O(cells) C-level work, and O(rows) Python steps plus
+            a few per run of empty cells in a row.
+        uncover, is_hidden, get_value: O(1).
+
+    With defer_mines the mines are placed by the first uncover instead, away
+    from the uncovered cell, so the first move is always safe and boards
+    that are never played cost no generation at all.
+
+    The board also keeps running counters of the uncovered cells, the hidden
+    non-mine cells and the uncovered mines, so the game status can be read
+    in O(1) (see Game.get_status), and of the flagged cells.
+    """
+    __slots__ = ('rows', 'columns', 'large', 'startState', '_values', '_state',
+                 '_uncoveredCount', '_hiddenSafeCount', '_uncoveredMines', '_flagCount',
+                 '_rippleType', '_visited', '_pending', '_offsets', '_columnKeys')
+
+    MINE = 9
+    HIDDEN, SHOWN, FLAGGED = 0, 1, 2
+    _SYMBOLS = '012345678*'
+
+    MAX_ROWS, MAX_COLUMNS = 20, 50
+    LARGE_MAX_ROWS, LARGE_MAX_COLUMNS = 10000, 10000
+    # the array type of flat indices, wide enough for the largest board
+    _INDEX_TYPE = 'i'
+
+    _HEADER = struct.Struct('<4sBII')
+    _MAGIC, _VERSION, _COMPACT_VERSION, _PENDING_VERSION = b'MSWB', 1, 2, 3
+    _FLAGGED_VERSION = 4
+    _PENDING = struct.Struct('<IB')
+    _VALUE_BYTES, _STATE_BYTES = bytearray(range(10)), bytearray(range(3))
+    _HIDDEN_BIT_TABLE = bytes.maketrans(b'\x00\x01\x02', b'101')
+    _FLAG_BIT_TABLE = bytes.maketrans(b'\x00\x01\x02', b'001')
+    _BIT_STATE_TABLE = bytes.maketrans(b'10', b'\x00\x01')
+    _MINE_PAIR_TABLE = bytes(bytearray(2 if b == 9 else 0 for b in range(256)))
+    _EMPTY_BIT_TABLE = bytes.maketrans(bytes(bytearray(range(10))), b'1000000000')
+    _NUMBER_BIT_TABLE = bytes.maketrans(bytes(bytearray(range(10))), b'0111111110')
+    _EMPTY_RUN = re.compile(b'\x00+')
+
+    _ROW_FORMAT = re.compile(r'[0-8*][HSF](?: [0-8*][HSF])*\Z')
+    _PENDING_FORMAT = re.compile(r'mines ([0-9]+)( opening)?\Z')
+    _VALUE_TABLE = bytes.maketrans(b'012345678*', b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09')
+    _STATE_TABLE = bytes.maketrans(b'HSF', b'\x00\x01\x02')
+    _SYMBOL_TABLE = bytes.maketrans(b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09', b'012345678*')
+    _LETTER_TABLE = bytes.maketrans(b'\x00\x01\x02', b'HSF')
+
+    def __init__(self, rows, columns, large=False, ripple_type=RippleTypes.Queue):
         """Initializes an empty hidden board.
 
         The board will be in the specified dimensions, without mines in it,
@@ -49,6 +184,10 @@ class Board(object):
         Args:
             rows: the number of rows in the board
             columns: the number of columns in the board
+            large: if True, allow boards up to LARGE_MAX_ROWS x
+            LARGE_MAX_COLUMNS instead of MAX_ROWS x MAX_COLUMNS
+            ripple_type: one of RippleTypes values, the order in which
+            ripple_sequence lists the cells (see set_ripple_type)
 
         Returns:
             None (alters self)
@@ -56,19 +195,35 @@ class Board(object):
         Raises:
             SizeOutOfBoundException if one of the arguments is non positive,
             or the board size is smaller than 1x2 (rows first) or larger than
-            20x50.
+            20x50 (10000x10000 in large mode).
 
         """
-        if rows < 1 or rows > 20 or columns < 2 or columns > 50:
+        maxRows, maxColumns = self.MAX_ROWS, self.MAX_COLUMNS
+        if large:
+            maxRows, maxColumns = self.LARGE_MAX_ROWS, self.LARGE_MAX_COLUMNS
+        if rows < 1 or rows > maxRows or columns < 2 or columns > maxColumns:
             raise SizeOutOfBoundException
         
         self.rows, self.columns = rows, columns
+        self.large = large
         self.startState = True
-        self.board = {}
-        self.uncovered = []
-        cells = [(r,c) for r in range(self.rows) for c in range(self.columns)]
-        for (r,c) in cells:
-            self.board.update({(r,c):0})
+        self._values = bytearray(rows * columns)
+        self._state = bytearray(rows * columns)
+        self._uncoveredCount = 0
+        self._hiddenSafeCount = rows * columns
+        self._uncoveredMines = 0
+        self._flagCount = 0
+        self._visited = None
+        self._pending = None
+        self._offsets = self._neighborOffsets(columns)
+        self._columnKeys = bytearray(((c != 0) << 2) | ((c != columns - 1) << 3) for c in range(columns))
+        self.set_ripple_type(ripple_type)
+
+    def _index(self, row, column):
+        """Returns the flat array index of a cell, validating its indices."""
+        if row < 0 or row >= self.rows or column < 0 or column >= self.columns:
+            raise IllegalIndicesException
+        return row * self.columns + column
 
     def getRows(self):
         return self.rows
@@ -76,15 +231,110 @@ class Board(object):
     def getColumns(self):
         return self.columns
 
+    def getUncoveredCount(self):
+        return self._uncoveredCount
+
+    def getHiddenSafeCount(self):
+        return self._hiddenSafeCount
+
+    def getUncoveredMines(self):
+        return self._uncoveredMines
+
+    def getFlagCount(self):
+        return self._flagCount
+
+    def getPendingMines(self):
+        """Returns the number of mines deferred by defer_mines, or 0."""
+        return self._pending[0] if self._pending is not None else 0
+
+    def _resetCounters(self):
+        """Recomputes the status counters from the cell arrays.
+
+        Only C-level scans are used: the uncovered mines are counted by
+        interleaving a mine flag (2) with the state (0/1) of every cell, so
+        each uncovered mine shows up as one '\\x02\\x01' pair.
+        """
+        values, state = self._values, self._state
+        mines = values.count(bytearray([self.MINE]))
+        self._uncoveredCount = state.count(bytearray([self.SHOWN]))
+        self._flagCount = state.count(bytearray([self.FLAGGED]))
+        pairs = bytearray(2 * len(values))
+        pairs[0::2] = values.translate(self._MINE_PAIR_TABLE)
+        pairs[1::2] = state
+        self._uncoveredMines = pairs.count(b'\x02\x01')
+        uncoveredSafe = self._uncoveredCount - self._uncoveredMines
+        self._hiddenSafeCount = len(values) - mines - uncoveredSafe
+
+    def _cellsIn(self, state):
+        """Returns the (r,c) cells in the given state, in row-major order."""
+        cells, state = [], bytearray([state])
+        i = self._state.find(state)
+        while i != -1:
+            cells.append(divmod(i, self.columns))
+            i = self._state.find(state, i + 1)
+        return cells
+
     def getUncoveredCells(self):
-        return self.uncovered
+        """Returns the (r,c) uncovered cells, in row-major order.
+
+        The cells are found by scanning the state array, so they are listed
+        by row and then by column, not in the order they were uncovered (the
+        original list-backed board listed them in that order).
+        """
+        return self._cellsIn(self.SHOWN)
+
+    def getFlaggedCells(self):
+        return self._cellsIn(self.FLAGGED)
+
+    @staticmethod
+    def _neighborOffsets(columns):
+        """Returns the neighbor offsets table of boards with the given columns.
+
+        Entry k holds the offsets (in the flat arrays) of the neighbors of a
+        cell, listed clockwise from the cell above, where the bits of k tell
+        if the cell has a row above it (1), a row below it (2), a column to
+        its left (4) and a column to its right (8). The column bits of every
+        column are kept in _columnKeys.
+        """
+        table = []
+        for k in range(16):
+            top, bottom, left, right = k & 1, k & 2, k & 4, k & 8
+            offsets = []
+            if top:
+                offsets.append(-columns)
+                if right:
+                    offsets.append(-columns + 1)
+            if right:
+                offsets.append(1)
+            if bottom:
+                if right:
+                    offsets.append(columns + 1)
+                offsets.append(columns)
+                if left:
+                    offsets.append(columns - 1)
+            if left:
+                offsets.append(-1)
+                if top:
+                    offsets.append(-columns - 1)
+            table.append(tuple(offsets))
+        return tuple(table)
+
+    def _neighbors(self, i):
+        """Returns the flat indices of the cells around the cell at index i.
+
+        The neighbors are listed clockwise, starting from the cell above, and
+        cells outside the board are skipped.
+        """
+        columns = self.columns
+        k = (i >= columns) | ((i < len(self._values) - columns) << 1) | self._columnKeys[i % columns]
+        return [i + offset for offset in self._offsets[k]]
 
     def updateCell(self, r, c):
-        neighbors = [(r-1, c-1), (r-1, c), (r-1, c+1), (r, c-1), (r, c+1), (r+1, c-1), (r+1, c), (r+1, c+1)]
-        neighbors = [(row, col) for (row, col) in neighbors if (row, col) in self.board.keys()]
-        self.board[(r,c)] = len([(row, col) for (row, col) in neighbors if self.board[(row, col)] == '*'])
+        values = self._values
+        neighbors = self._neighbors(self._index(r, c))
+        values[r * self.columns + c] = len([i for i in neighbors if values[i] == self.MINE])
 
-    def put_mines(self, mines):
+    def put_mines(self, mines, rng=None, exclude=()):
         """Randomly scatter the requested number of mines on the board.
 
         At the beggining, all cells on the board are hidden and with no mines
@@ -96,36 +346,224 @@ class Board(object):
 
         Args:
             mines: the number of mines to scatter
+            rng: optional random.Random instance to draw the mines from.
+            Boards drawn from equally seeded instances are identical,
+            whether NumPy is installed or not.
+            exclude: (r,c) cells that must not get a mine (e.g. a first move)
 
         Returns:
             None (alters self)
 
         Raises:
             ScatterException if the number of mines is smaller than 1 or larger
-            than (rows*columns - 1), and if the board is not in beginning state
+            than (rows*columns - 1) or than the number of cells that are not
+            excluded, and if the board is not in beginning state
+            IllegalIndicesException if an excluded cell is out of bounds.
             If an exception is raised, the board should be in the same state
             as before calling this method.
 
         """
 
-        if mines < 1 or mines > (self.rows*self.columns-1) or (not self.startState):
+        cells = self.rows * self.columns
+        excluded = set(self._index(r, c) for (r, c) in exclude)
+        if mines < 1 or mines > (cells-1) or (not self.startState):
             raise ScatterException
-        
-        for i in range(mines):
-            scattered = False
-            while not scattered:
-                r = random.randint(0, self.rows-1)
-                c = random.randint(0, self.columns-1)
-                if self.board[(r,c)] != '*':
-                    self.board[(r,c)] = '*'
-                    scattered = True
-
-        for (r,c) in self.board.keys():
-            if self.board[(r,c)] != '*':
-                self.updateCell(r, c)
-        
+        if mines > cells - len(excluded):
+            raise ScatterException
+
+        self._place(mines, rng, excluded)
+
+    def _place(self, mines, rng, excluded):
+        if rng is None and _numpy() is not None:
+            self._values = self._numpyScatter(mines, excluded)
+        else:
+            import random
+            self._values = self._scatter(mines, rng or random, excluded)
+        self._resetCounters()
+        self._pending = None
+        self.startState = False
+
+    def defer_mines(self, mines, opening=True, rng=None, pool=None):
+        """Scatters the mines lazily, when the first cell is uncovered.
+
+        The board stays without mines (all of its values are 0) until the
+        first call to uncover, which scatters the mines like put_mines but
+        keeps the uncovered cell free of mines, and if opening is True (and
+        there are enough cells) also the cells around it, so the first move
+        opens an area.
+
+        With a pool, the first uncover doesn't scatter the mines itself but
+        takes a board generated in advance from the pool, and moves the
+        mines that are on the kept cells (at most nine) to random free
+        cells. This keeps the layout uniformly random among those that leave
+        the kept cells free, and costs O(1) instead of a generation.
+
+        Args:
+            mines: the number of mines to scatter
+            opening: keep the neighbors of the first cell free of mines too
+            rng: optional random.Random instance to draw the mines from (or
+            to draw the cells the mines are moved to, with a pool)
+            pool: optional pool.BoardPool to take the mines from
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            ScatterException in the cases put_mines raises it.
+
+        """
+        if mines < 1 or mines > (self.rows * self.columns - 1) or (not self.startState):
+            raise ScatterException
+        self._pending = (mines, opening, rng, pool)
+        self.startState = False
+
+    def _adopt(self, layout, excluded, rng):
+        """Takes the mines of layout, moving those on excluded cells away.
+
+        Every mine on an excluded cell is moved to a random cell that is
+        neither excluded nor mined (see relocate_mine).
+        """
+        if (layout.rows, layout.columns) != (self.rows, self.columns):
+            raise DimensionsMismatchException
+        if rng is None:
+            import random
+            rng = random
+        self._values = bytearray(layout._values)
+        self._resetCounters()
+        self._pending = None
         self.startState = False
 
+        cells, columns = len(self._values), self.columns
+        for i in excluded:
+            if self._values[i] == self.MINE:
+                j = rng.randrange(cells)
+                while j in excluded or self._values[j] == self.MINE:
+                    j = rng.randrange(cells)
+                self.relocate_mine(i // columns, i % columns, j // columns, j % columns)
+
+    def _scatter(self, mines, rng, excluded):
+        """Returns the cell values of a new board with the given mines.
+
+        This is the pure Python generation path, used when NumPy is missing
+        or when the mines are drawn from the given rng.
+        Whichever of mines/free cells is the minority is drawn, so every
+        draw hits an unused cell with probability of at least a half, and
+        each mine is then added to the counts of its neighbors. Excluded
+        cells are marked with a value that is neither free nor a mine while
+        drawing, so they are never drawn.
+        """
+        cells = self.rows * self.columns
+        MINE = self.MINE
+        if 2 * mines <= cells - len(excluded):
+            values, old, new, count = bytearray(cells), 0, MINE, mines
+            for i in excluded:
+                values[i] = MINE + 1
+        else:
+            values, old, new = bytearray([MINE]) * cells, MINE, 0
+            count = cells - len(excluded) - mines
+            for i in excluded:
+                values[i] = 0
+        while count > 0:
+            i = rng.randrange(cells)
+            if values[i] == old:
+                values[i] = new
+                count -= 1
+        for i in excluded:
+            values[i] = 0
+
+        mine = bytearray([MINE])
+        i = values.find(mine)
+        while i != -1:
+            for j in self._neighbors(i):
+                if values[j] != MINE:
+                    values[j] += 1
+            i = values.find(mine, i + 1)
+        return values
+
+    def _numpyScatter(self, mines, excluded):
+        """Returns the cell values of a new board with the given mines.
+
+        This is the NumPy generation path. Cells are sampled without
+        replacement in vectorized rounds, on a flat mask of the cells: each
+        round draws as many cells as are still missing and marks the unused
+        ones, so a cell drawn twice is only marked once, and the marked
+        cells are counted again (drawing the minority of mines/free cells,
+        and marking excluded cells as neither). Nothing is sorted, so every
+        round is O(cells + drawn), and the rounds shrink geometrically.
+        Neighbor counts are then the sum of the nine 3x3 shifts of the
+        zero-padded mine grid.
+        """
+        numpy = _numpy()
+        rows, columns = self.rows, self.columns
+        cells = rows * columns
+        padded = numpy.zeros((rows + 2, columns + 2), dtype=numpy.uint8)
+        grid = padded[1:-1, 1:-1]
+        skipped = numpy.array(sorted(excluded), dtype=numpy.int64)
+        flat = numpy.zeros(cells, dtype=numpy.uint8)
+        if 2 * mines <= cells - len(excluded):
+            old, new, count = 0, 1, mines
+            flat[skipped] = 2
+        else:
+            old, new, count = 1, 0, cells - len(excluded) - mines
+            flat[:] = 1
+            flat[skipped] = 0
+        target = count + numpy.count_nonzero(flat == new)
+        while count > 0:
+            drawn = numpy.random.randint(0, cells, count)
+            flat[drawn[flat[drawn] == old]] = new
+            count = target - numpy.count_nonzero(flat == new)
+        flat[skipped] = 0
+        grid[:] = flat.reshape(rows, columns)
+
+        counts = numpy.zeros((rows, columns), dtype=numpy.uint8)
+        for dr in range(3):
+            for dc in range(3):
+                counts += padded[dr:dr + rows, dc:dc + columns]
+        counts[grid == 1] = self.MINE
+        return bytearray(counts)
+
+    def relocate_mine(self, row, column, toRow, toColumn):
+        """Moves the mine at (row, column) to the free cell (toRow, toColumn).
+
+        Only the values of the cells around the two cells change, so this
+        takes O(1). The states of the cells are not changed.
+
+        Args:
+            row, column: the indices of a cell with a mine
+            toRow, toColumn: the indices of a cell without a mine
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalIndicesException if some indices are out of bounds.
+            IllegalMoveException if the first cell has no mine, or the second
+            cell has one.
+
+        """
+        source, target = self._index(row, column), self._index(toRow, toColumn)
+        values, state, MINE = self._values, self._state, self.MINE
+        if values[source] != MINE or values[target] == MINE:
+            raise IllegalMoveException
+
+        for j in self._neighbors(source):
+            if values[j] != MINE:
+                values[j] -= 1
+        values[source] = len([j for j in self._neighbors(source) if values[j] == MINE])
+        for j in self._neighbors(target):
+            if values[j] != MINE:
+                values[j] += 1
+        values[target] = MINE
+
+        if state[source] == self.SHOWN:
+            self._uncoveredMines -= 1
+        else:
+            self._hiddenSafeCount += 1
+        if state[target] == self.SHOWN:
+            self._uncoveredMines += 1
+        else:
+            self._hiddenSafeCount -= 1
+
     def load_board(self, lines):
         """Loads a board from a sequence of lines.
 
@@ -133,11 +571,13 @@ class Board(object):
         (that usually represent lines). Each line represents a row in the table
         in the following format:
             XY XY XY ... XY
-        Where X is one of the characters: 0-8, * and Y is one of letters: H, S.
+        Where X is one of the characters: 0-8, * and Y is one of letters: H, S,
+        F.
         0-8 = number of adjusting mines (0 is an empty, mine-free cell)
         * = represents a mine in this cell
         H = this cell is hidden
         S = this cell is uncovered (can be seen)
+        F = this cell is hidden and flagged (see flag)
 
         The lines can have multiple whitespace of any kind before and after the
         lines of cells, but between each XY pair there is exactly one space.
@@ -146,20 +586,29 @@ class Board(object):
         values are correct (the number represents the number of mines around
         a given cell) and the number of mines is also legal.
         Also note that the combination of '0S' is legal.
+        A board whose mines are deferred (see defer_mines) is saved with the
+        line "mines N", or "mines N opening", before its rows (which are all
+        '0H'), and the mines are deferred again when it is loaded.
 
         Note that this method doesn't get the first two rows of the file (the
         dimensions) on purpose - they are handled in __init__.
 
+        The lines are parsed one at a time, so they can be streamed from a
+        file object. Each row is checked with a regular expression and its
+        values and states are translated straight into the board arrays.
+
         Args:
-            lines: a sequence (list or tuple) of lines with the above
-            restrictions
+            lines: an iterable of lines (list, tuple, file object...) with
+            the above restrictions
 
         Returns:
             None (alters self)
 
         Raises:
             BoardFormatException if the lines are empty (all of them),
-            or there are wrong X/Y values etc.
+            or there are wrong X/Y values etc., or a deferred mines line is
+            misplaced, illegal, or followed by mines or uncovered or flagged
+            cells.
             DimensionsMismatchException if the number of valid lines is
             different than the Board dimensions, or if the number of cells per
             row is unequal on different lines, or different from the Board
@@ -170,44 +619,63 @@ class Board(object):
             unstable state (partly copied).
 
         """
-        lines = [line.strip() for line in lines if line.strip() != '']    
-        if lines == []:
-            raise BoardFormatException
-
-        legalValues = ['0','1','2','3','4','5','6','7','8','*']
-        legalStates = ['H', 'S']
-        newBoard, newUncovered, pairs = {}, [], []
+        rows, columns = self.rows, self.columns
+        newValues = bytearray(rows * columns)
+        newState = bytearray(rows * columns)
+        isRow = self._ROW_FORMAT.match
+        pending = None
 
+        # keep reading after a dimensions error, a later format error wins
         dimensionsError = False
-        if len(lines) != self.rows:
-            dimensionsError = True
-
-        for r in range(len(lines)):
-            pairs = lines[r].split(' ')
-            if len(pairs) != self.columns:
-                dimensionsError = True
-            for c in range(len(pairs)):
-                elements = list(pairs[c])
-                if len(elements) != 2: 
+        r = 0
+        for line in lines:
+            line = line.strip()
+            if line == '':
+                continue
+            if not isRow(line):
+                deferred = self._PENDING_FORMAT.match(line)
+                if deferred is None or r > 0 or pending is not None:
                     raise BoardFormatException
-                if elements[0] not in legalValues or elements[1] not in legalStates:
+                pending = (int(deferred.group(1)), deferred.group(2) is not None, None, None)
+                if pending[0] < 1 or pending[0] > rows * columns - 1:
                     raise BoardFormatException
-                
-                if elements[0] == '*':
-                    newBoard.update({(r,c):elements[0]})
-                else:
-                    newBoard.update({(r,c):int(elements[0])})
-                
-                if elements[1] == 'S':
-                    newUncovered.append((r,c))
+                continue
+            if r >= rows or len(line) != 3 * columns - 1:
+                dimensionsError = True
+            if not dimensionsError:
+                start, cells = r * columns, line.encode('ascii')
+                newValues[start:start + columns] = cells[0::3].translate(self._VALUE_TABLE)
+                newState[start:start + columns] = cells[1::3].translate(self._STATE_TABLE)
+            r += 1
 
-        if dimensionsError:
+        if r == 0:
+            raise BoardFormatException
+        if r != rows or dimensionsError:
             raise DimensionsMismatchException
-        
-        self.board = newBoard
-        self.uncovered = newUncovered
+        if pending is not None and (newValues.translate(None, b'\x00') or newState.translate(None, b'\x00')):
+            raise BoardFormatException
 
-    def save_board(self, filename):
+        self._values = newValues
+        self._state = newState
+        self._pending = pending
+        self._resetCounters()
+
+    def _formatRows(self):
+        """Returns the rows of the board in the load_board format.
+
+        The text is assembled with C-level operations only: the value and
+        state arrays are translated to characters and interleaved with the
+        separating spaces, and then cut into newline-terminated rows.
+        """
+        columns = self.columns
+        text = bytearray(b' ') * (3 * len(self._values))
+        text[0::3] = self._values.translate(self._SYMBOL_TABLE)
+        text[1::3] = self._state.translate(self._LETTER_TABLE)
+        width = 3 * columns
+        rows = [text[start:start + width] for start in range(0, len(text), width)]
+        return bytearray(b'\n').join(rows).decode('ascii') + '\n'
+
+    def save_board(self, filename, atomic=False):
         """Saves a Board object to a text file.
 
         Saves the current Board (self) to a file in the following format:
@@ -223,9 +691,17 @@ class Board(object):
         and #columns), and include empty or whitespace-only lines everywhere,
         including at the start/end of the file, and between any two lines.
 
+        The whole file is written with a single buffered write. In atomic
+        mode it is first written to a temporary file in the same directory,
+        which then replaces filename, so a crash in the middle of a save
+        leaves either the old file or the new one, never a partial file.
+        The new file keeps the permissions of the file it replaces, or gets
+        the ones of a plain save (0666 minus the umask) if there was none.
+
         Args:
             filename: the file name (as string) to write to, can be absolute
             or relative path, or even illegal.
+            atomic: if True, replace the file atomically as described above
 
         Returns:
             None (and doesn't alters self)
@@ -235,24 +711,287 @@ class Board(object):
             and don't handle it)
 
         """
-        document = open(filename, 'w')
-        document.write(str(self.rows) + '\n')
-        document.write(str(self.columns) + '\n')
+        text = '%d\n%d\n' % (self.rows, self.columns)
+        if self._pending is not None:
+            text += 'mines %d%s\n' % (self._pending[0], ' opening' if self._pending[1] else '')
+        text += self._formatRows()
+        self._write(filename, text, 'w', atomic)
+
+    @staticmethod
+    def _write(filename, data, mode, atomic):
+        """Writes data to filename with one write, atomically if asked to."""
+        if not atomic:
+            with open(filename, mode) as document:
+                document.write(data)
+            return
 
-        lines = []
+        try:
+            permissions = os.stat(filename).st_mode & 0o7777
+        except OSError:
+            permissions = None
+        # not tempfile.mkstemp: its files are created with mode 0600, while
+        # os.open applies the umask to 0666 like a plain open does
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+        while True:
+            temporary = os.path.join(os.path.dirname(filename),
+                                     '.%s.%s.tmp' % (os.path.basename(filename),
+                                                     binascii.hexlify(os.urandom(6)).decode()))
+            try:
+                descriptor = os.open(temporary, flags, 0o666)
+                break
+            except FileExistsError:
+                pass
+        try:
+            with os.fdopen(descriptor, mode) as document:
+                document.write(data)
+                document.flush()
+                os.fsync(document.fileno())
+            if permissions is not None:
+                os.chmod(temporary, permissions)
+            os.replace(temporary, filename)
+        except:
+            os.remove(temporary)
+            raise
+
+    def to_bytes(self, compact=False):
+        """Returns the Board encoded in the binary board format.
+
+        The format is a header holding the magic string 'MSWB', a version
+        byte and the number of rows and of columns (little-endian unsigned
+        32 bit integers), followed by the cells in row-major order:
+            version 1: rows*columns value bytes (0-8, or MINE), then
+                rows*columns state bytes (HIDDEN, SHOWN or FLAGGED).
+            version 2 (compact): the values packed two cells per byte (the
+                first cell in the high nibble), then a bitmap with one bit
+                per cell, set if the cell is hidden (the first cell in the
+                most significant bit). Both are zero padded to whole bytes.
+            version 3 (deferred mines, see defer_mines): the number of
+                mines (a little-endian unsigned 32 bit integer) and an
+                opening byte (0 or 1). All the cells are hidden and 0.
+            version 4 (compact with flags): version 2, followed by a second
+                bitmap with the bits of the flagged cells set. Compact
+                records of boards with flags are written in this version.
+        Records can be concatenated, since the header tells the size of the
+        record (see record_size).
+
+        Args:
+            compact: if True, use version 2 or 4 (about 0.63 or 0.75 bytes
+            per cell instead of 2)
+
+        Returns:
+            the encoded board (a byte string, doesn't alters self)
+
+        """
+        if self._pending is not None:
+            header = self._HEADER.pack(self._MAGIC, self._PENDING_VERSION, self.rows, self.columns)
+            return header + self._PENDING.pack(self._pending[0], self._pending[1])
+        if not compact:
+            header = self._HEADER.pack(self._MAGIC, self._VERSION, self.rows, self.columns)
+            return header + bytes(self._values) + bytes(self._state)
+
+        # every value byte is hexlified to '0X', and pairs of X digits are
+        # unhexlified back into a byte
+        digits = binascii.hexlify(self._values)[1::2]
+        if len(digits) % 2:
+            digits += b'0'
+        version, bits = self._COMPACT_VERSION, self._bitmap(self._HIDDEN_BIT_TABLE)
+        if self._flagCount:
+            version, bits = self._FLAGGED_VERSION, bits + self._bitmap(self._FLAG_BIT_TABLE)
+        header = self._HEADER.pack(self._MAGIC, version, self.rows, self.columns)
+        return header + binascii.unhexlify(digits) + bits
+
+    def _bitmap(self, table):
+        """Packs the states translated by table to '0'/'1', eight cells a byte."""
+        bits = self._state.translate(table)
+        bits += b'0' * (-len(bits) % 8)
+        return binascii.unhexlify('%0*x' % (len(bits) // 4, int(bits, 2)))
+
+    @staticmethod
+    def _unbitmap(data, cells):
+        """Returns the first cells bits of a packed bitmap as b'0'/b'1' bytes."""
+        return '{0:0{1}b}'.format(int(binascii.hexlify(data), 16), 8 * len(data))[:cells].encode('ascii')
+
+    @classmethod
+    def record_size(cls, header):
+        """Returns the size of a binary board record, given its header.
+
+        Args:
+            header: the first bytes of a record (at least the header)
+
+        Returns:
+            the size of the whole record in bytes (including the header)
+
+        Raises:
+            BoardFormatException if the header is not a board header.
+
+        """
+        if len(header) < cls._HEADER.size:
+            raise BoardFormatException
+        magic, version, rows, columns = cls._HEADER.unpack_from(header)
+        cells = rows * columns
+        if magic != cls._MAGIC:
+            raise BoardFormatException
+        if version == cls._VERSION:
+            return cls._HEADER.size + 2 * cells
+        if version == cls._COMPACT_VERSION:
+            return cls._HEADER.size + (cells + 1) // 2 + (cells + 7) // 8
+        if version == cls._FLAGGED_VERSION:
+            return cls._HEADER.size + (cells + 1) // 2 + 2 * ((cells + 7) // 8)
+        if version == cls._PENDING_VERSION:
+            return cls._HEADER.size + cls._PENDING.size
+        raise BoardFormatException
+
+    @classmethod
+    def from_stream(cls, stream, large=False):
+        """Reads the next binary board record from a binary file object.
+
+        Returns:
+            a new Board object, or None at the end of the stream
+
+        Raises:
+            the exceptions of from_bytes, and BoardFormatException if the
+            stream ends in the middle of a header.
+
+        """
+        header = stream.read(cls._HEADER.size)
+        if not header:
+            return None
+        record = header + stream.read(cls.record_size(header) - len(header))
+        return cls.from_bytes(record, large)
+
+    @classmethod
+    def from_bytes(cls, data, large=False):
+        """Creates a Board from a record in the binary board format.
+
+        Args:
+            data: a byte string (or any object supporting the buffer
+            protocol and slicing, e.g. an mmap) holding one record, as
+            returned by to_bytes
+            large: allow the dimensions of a large board (see __init__)
+
+        Returns:
+            a new Board object
+
+        Raises:
+            BoardFormatException if the header is not a board header, or a
+            cell holds an illegal value or state (or is both uncovered and
+            flagged), or the deferred mines are illegal.
+            DimensionsMismatchException if the size of the data doesn't
+            match the dimensions in the header.
+            SizeOutOfBoundException if the dimensions are illegal.
+
+        """
+        size = cls.record_size(data)
+        magic, version, rows, columns = cls._HEADER.unpack_from(data)
+
+        board = cls(rows, columns, large)
+        if len(data) != size:
+            raise DimensionsMismatchException
+        with memoryview(data) as view:
+            return cls._unpack(board, view, version)
+
+    @classmethod
+    def _unpack(cls, board, data, version):
+        """Fills board with the cells of a record (see from_bytes).
+
+        data is a memoryview of the record, so its slices don't copy it.
+        """
+        rows, columns = board.rows, board.columns
+        cells, start = rows * columns, cls._HEADER.size
+        if version == cls._PENDING_VERSION:
+            mines, opening = cls._PENDING.unpack_from(data, start)
+            if mines < 1 or mines > cells - 1 or opening > 1:
+                raise BoardFormatException
+            board._pending = (mines, opening == 1, None, None)
+            return board
+        # the arrays of the empty board are replaced, they are dropped first
+        board._values = board._state = None
+        if version == cls._VERSION:
+            values = bytearray(data[start:start + cells])
+            state = bytearray(data[start + cells:])
+        else:
+            middle = start + (cells + 1) // 2
+            digits = binascii.hexlify(data[start:middle])[:cells]
+            values = bytearray(b'0') * (2 * cells)
+            values[1::2] = digits
+            values = bytearray(binascii.unhexlify(values))
+            end = middle + (cells + 7) // 8
+            state = bytearray(cls._unbitmap(data[middle:end], cells).translate(cls._BIT_STATE_TABLE))
+            if version == cls._FLAGGED_VERSION:
+                flags = cls._unbitmap(data[end:], cells)
+                i = flags.find(b'1')
+                while i != -1:
+                    if state[i] != cls.HIDDEN:
+                        raise BoardFormatException
+                    state[i] = cls.FLAGGED
+                    i = flags.find(b'1', i + 1)
+        if not (cls._legal(values, cls._VALUE_BYTES) and cls._legal(state, cls._STATE_BYTES)):
+            raise BoardFormatException
+
+        board._values, board._state = values, state
+        board._resetCounters()
+        return board
+
+    @staticmethod
+    def _legal(cells, legal):
+        """Returns True if all the bytes of cells are in legal.
+
+        The bytes are checked a chunk at a time, so the check doesn't copy
+        the whole array.
+        """
+        with memoryview(cells) as view:
+            for k in range(0, len(cells), 1 << 16):
+                if view[k:k + (1 << 16)].tobytes().translate(None, legal):
+                    return False
+        return True
+
+    def save_binary(self, filename, atomic=False):
+        """Saves a Board object to a file in the compact binary format.
+
+        Args:
+            filename: the file name (as string) to write to
+            atomic: if True, replace the file atomically (see save_board)
+
+        Returns:
+            None (and doesn't alters self)
+
+        Raises:
+            IOError in case of any file/IO related problem
+
+        """
+        self._write(filename, self.to_bytes(compact=True), 'wb', atomic)
+
+    @classmethod
+    def load_binary(cls, filename, large=False):
+        """Loads a Board object from a file in the binary format.
+
+        The file is memory-mapped, and the cell arrays are unpacked from
+        the mapped pages through a memoryview (see from_bytes), with C-level
+        operations, so the file is never copied: the format of version 1 is
+        read straight into the arrays of the board, and the compact format
+        through intermediate arrays of the unpacked cells.
+
+        Args:
+            filename: the file name (as string) to read from
+            large: allow the dimensions of a large board (see __init__)
+
+        Returns:
+            a new Board object
 
-        for r in range(self.rows):
-            line = ''
-            for c in range(self.columns):
-                value = self.board[(r,c)]
-                state = 'H'
-                if (r,c) in self.uncovered:
-                    state = 'S'
-                line += str(value) + state + ' '
-            line += '\n'
-            lines.append(line)
+        Raises:
+            the exceptions of from_bytes, and IOError in case of any
+            file/IO related problem
 
-        document.writelines(lines)
+        """
+        import mmap
+        with open(filename, 'rb') as document:
+            if os.fstat(document.fileno()).st_size < cls._HEADER.size:
+                raise BoardFormatException
+            data = mmap.mmap(document.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return cls.from_bytes(data, large)
+            finally:
+                data.close()
 
     def get_value(self, row, column):
         """Returns the value of the cell at the given indices.
@@ -274,9 +1013,7 @@ class Board(object):
             (below 0 or larger than max row/column).
 
         """
-        if (row, column) not in self.board.keys():
-            raise IllegalIndicesException
-        return str(self.board[(row, column)])
+        return self._SYMBOLS[self._values[self._index(row, column)]]
 
     def is_hidden(self, row, column):
         """Returns if the given cell is in hidden or uncovered state.
@@ -286,7 +1023,8 @@ class Board(object):
             column: column index (integer)
 
         Returns:
-            'H' if the cell is hidden, or 'S' if it's uncovered (can be seen).
+            'H' if the cell is hidden (flagged or not), or 'S' if it's
+            uncovered (can be seen).
 
         Raises:
             IllegalIndicesException if rows/columns/both is out of bounds
@@ -294,15 +1032,16 @@ class Board(object):
 
         """
         retval = 'H'
-        if (row, column) not in self.board.keys():
-            raise IllegalIndicesException
-        if (row, column) in self.uncovered:
+        if self._state[self._index(row, column)] == self.SHOWN:
             retval = 'S'
         return retval
 
     def uncover(self, row, column):
         """Changes the status of a cell from hidden to seen.
 
+        If the mines of the board are deferred (see defer_mines), they are
+        scattered first, away from this cell.
+
         Args:
             row: row index (integer)
             column: column index (integer)
@@ -313,26 +1052,207 @@ class Board(object):
         Raises:
             IllegalIndicesException if rows/columns/both is out of bounds
             (below 0 or larger than max row/column).
-            IllegalMoveException if the cell was already uncovered before
-            (and the indices given are legal).
+            IllegalMoveException if the cell was already uncovered before,
+            or is flagged (and the indices given are legal).
 
         """
-        if (row, column) not in self.board.keys():
-            raise IllegalIndicesException
-        if (row, column) in self.uncovered:
+        i = self._index(row, column)
+        if self._state[i] != self.HIDDEN:
             raise IllegalMoveException
-        self.uncovered.append((row, column))
+        if self._pending is not None:
+            (mines, opening, rng, pool) = self._pending
+            excluded = set([i])
+            if opening and mines <= len(self._values) - 1 - len(self._neighbors(i)):
+                excluded.update(self._neighbors(i))
+            if pool is not None:
+                self._adopt(pool.get(self.rows, self.columns, mines, self.large), excluded, rng)
+            else:
+                self._place(mines, rng, excluded)
+        self._state[i] = self.SHOWN
+        self._uncoveredCount += 1
+        if self._values[i] == self.MINE:
+            self._uncoveredMines += 1
+        else:
+            self._hiddenSafeCount -= 1
+
+    def cover(self, row, column):
+        """Changes the status of a cell from seen back to hidden.
+
+        This is the inverse of uncover, used to undo moves.
+
+        Args:
+            row: row index (integer)
+            column: column index (integer)
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds
+            (below 0 or larger than max row/column).
+            IllegalMoveException if the cell is hidden.
+
+        """
+        i = self._index(row, column)
+        if self._state[i] != self.SHOWN:
+            raise IllegalMoveException
+        self._state[i] = self.HIDDEN
+        self._uncoveredCount -= 1
+        if self._values[i] == self.MINE:
+            self._uncoveredMines -= 1
+        else:
+            self._hiddenSafeCount += 1
+
+    def is_flagged(self, row, column):
+        """Returns True if the given cell is flagged, and False otherwise.
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+
+        """
+        return self._state[self._index(row, column)] == self.FLAGGED
+
+    def flag(self, row, column):
+        """Flags a hidden cell, marking it as a mine.
+
+        A flagged cell stays hidden, but it can't be uncovered (until it is
+        unflagged), ripples pass around it, and it counts for chords (see
+        chord_sequence).
+
+        Args:
+            row: row index (integer)
+            column: column index (integer)
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+            IllegalMoveException if the cell is uncovered or already
+            flagged, or the mines of the board are still deferred.
+
+        """
+        i = self._index(row, column)
+        if self._state[i] != self.HIDDEN or self._pending is not None:
+            raise IllegalMoveException
+        self._state[i] = self.FLAGGED
+        self._flagCount += 1
+
+    def unflag(self, row, column):
+        """Removes the flag of a cell, which stays hidden.
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+            IllegalMoveException if the cell is not flagged.
+
+        """
+        i = self._index(row, column)
+        if self._state[i] != self.FLAGGED:
+            raise IllegalMoveException
+        self._state[i] = self.HIDDEN
+        self._flagCount -= 1
 
     def get_ripple_type(self):
         """Returns the ripple type of the current board.
 
-        Please note that this method should return a constant value, depending
-        on your implementation, and not on some board configurations.
+        The ripple type is chosen when the board is created (Queue by
+        default) or with set_ripple_type, and doesn't depend on the board
+        configuration.
 
         Returns:
             one of RippleType values (Simple, Recursive or Queue).
         """
-        return RippleTypes.Queue
+        return self._rippleType
+
+    def set_ripple_type(self, ripple_type):
+        """Sets the order in which ripple_sequence lists the cells.
+
+        Args:
+            ripple_type: one of RippleTypes values (Simple, Recursive or
+            Queue)
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            ValueError if ripple_type is not a RippleTypes value.
+
+        """
+        if ripple_type not in (RippleTypes.Simple, RippleTypes.Recursive, RippleTypes.Queue):
+            raise ValueError('unknown ripple type: %r' % (ripple_type,))
+        self._rippleType = ripple_type
+
+    def _rippleSimple(self, start, visited):
+        """Ripples over row and column of start: up, right, down then left.
+
+        Each direction stops at the board edge or an uncovered or flagged
+        cell, and after a cell that has mines around it.
+        """
+        columns, values, state = self.columns, self._values, self._state
+        r, c = divmod(start, columns)
+        directions = [(-columns, r), (1, columns - 1 - c), (columns, self.rows - 1 - r), (-1, c)]
+        sequence = array.array(self._INDEX_TYPE)
+        for (step, length) in directions:
+            i = start
+            for k in range(length):
+                i += step
+                if visited[i] or state[i] != self.HIDDEN:
+                    break
+                visited[i] = 1
+                sequence.append(i)
+                if values[i] != 0:
+                    break
+        return sequence
+
+    def _rippleRecursive(self, start, visited):
+        """Ripples depth first, each cell followed by its own ripple.
+
+        The recursion is unrolled into a stack of the cells being rippled
+        and the position of the next neighbor of each, kept in arrays (5
+        bytes per level), so large empty regions don't hit Python's
+        recursion limit or keep a frame object per level. The neighbors of
+        a cell are looked up again when the ripple returns to it, at most
+        once per neighbor it recursed into.
+        """
+        values, state = self._values, self._state
+        sequence = array.array(self._INDEX_TYPE)
+        cells, positions = array.array(self._INDEX_TYPE, [start]), bytearray(1)
+        while cells:
+            neighbors = self._neighbors(cells[-1])
+            k = positions[-1]
+            while k < len(neighbors):
+                i = neighbors[k]
+                k += 1
+                if not visited[i] and state[i] == self.HIDDEN:
+                    visited[i] = 1
+                    sequence.append(i)
+                    if values[i] == 0:
+                        positions[-1] = k
+                        cells.append(i)
+                        positions.append(0)
+                        break
+            else:
+                cells.pop()
+                positions.pop()
+        return sequence
+
+    def _rippleQueue(self, start, visited):
+        """Ripples breadth first, in the order of a BFS queue."""
+        values, state = self._values, self._state
+        sequence = array.array(self._INDEX_TYPE)
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            if values[i] == 0:
+                for j in self._neighbors(i):
+                    if not visited[j] and state[j] == self.HIDDEN:
+                        visited[j] = 1
+                        sequence.append(j)
+                        queue.append(j)
+        return sequence
     
     def ripple_sequence(self, row, column):
         """Returns the ripple sequence starting on the specified cell.
@@ -353,11 +1273,16 @@ class Board(object):
         If some direction has no rippling cells (=the cell is on an edge)
         then it is simply skipped. If the given cell has mines around it or
         there are no cells to ripple, return an empty sequence (e.g. []).
+        Flagged cells are never rippled, like uncovered ones.
 
         Args:
             row: row index (integer)
             column: column index (integer)
 
+        The order is set by the board's ripple type (see get_ripple_type).
+        Every order takes O(region) time: visited cells are marked in a
+        bitmap owned by the board, which is cleared again cell by cell.
+
         Returns:
             A sequence of (r,c) tuples (both integers) to ripple, or empty
             sequence in case there's nothing to ripple. Note this doesn't
@@ -368,33 +1293,195 @@ class Board(object):
             (below 0 or larger than max row/column).
 
         """
+        return list(self.ripple_cells(row, column))
+
+    def ripple_cells(self, row, column):
+        """Returns the ripple sequence of a cell as a CellSequence.
+
+        This is ripple_sequence without the list of (r,c) tuples: the cells
+        are kept as flat indices, 4 bytes per cell, which is what Game keeps
+        in its journal.
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+
+        """
+        i = self._index(row, column)
+        if self._values[i] != 0:
+            return CellSequence(self.columns, array.array(self._INDEX_TYPE))
+
+        visited = self._visitedMap()
+        visited[i] = 1
+        sequence = self._ripple()(i, visited)
+        visited[i] = 0
+        for j in sequence:
+            visited[j] = 0
+        return CellSequence(self.columns, sequence)
+
+    def _visitedMap(self):
+        """Returns the visited bitmap of the ripples, which is kept clear."""
+        if self._visited is None:
+            self._visited = bytearray(len(self._values))
+        return self._visited
+
+    def _ripple(self):
+        """Returns the ripple method of the board's ripple type."""
+        if self._rippleType == RippleTypes.Simple:
+            return self._rippleSimple
+        elif self._rippleType == RippleTypes.Recursive:
+            return self._rippleRecursive
+        return self._rippleQueue
+
+    def chord_sequence(self, row, column):
+        """Returns the cells to uncover when chording on the specified cell.
+
+        A chord is made on an uncovered number that has as many flagged
+        cells around it as its value: it uncovers all the hidden cells
+        around it that are not flagged (so a wrongly placed flag makes the
+        chord hit a mine). The neighbors are listed clockwise from the cell
+        above, as in ripple_sequence, and every neighbor without mines
+        around it is followed by its own ripple sequence. All the ripples
+        share the visited bitmap of the board, so they are merged in one
+        pass and no cell appears twice.
+
+        Args:
+            row: row index (integer)
+            column: column index (integer)
+
+        Returns:
+            A sequence of (r,c) tuples (both integers) to uncover, empty if
+            all the neighbors are uncovered or flagged. Note this doesn't
+            alters self.
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+            IllegalMoveException if the cell is hidden or a mine, or the
+            number of flags around it differs from its value.
+
+        """
+        i = self._index(row, column)
+        values, state = self._values, self._state
+        if state[i] != self.SHOWN or values[i] == self.MINE:
+            raise IllegalMoveException
+        neighbors = self._neighbors(i)
+        if len([j for j in neighbors if state[j] == self.FLAGGED]) != values[i]:
+            raise IllegalMoveException
+
+        visited, ripple = self._visitedMap(), self._ripple()
         sequence = []
+        for j in neighbors:
+            if not visited[j] and state[j] == self.HIDDEN:
+                visited[j] = 1
+                sequence.append(j)
+                if values[j] == 0:
+                    sequence.extend(ripple(j, visited))
+        for j in sequence:
+            visited[j] = 0
+
+        return [divmod(j, self.columns) for j in sequence]
+
+    def get_metrics(self):
+        """Returns the difficulty metrics of the board's mines layout.
+
+        The metrics are:
+            openings: the number of openings. An opening is an empty cell (no
+                mines around it) together with its ripple sequence, as the
+                Queue and Recursive ripples uncover it on a board with no
+                cell uncovered: a connected area of empty cells, and the
+                numbers on its border. A single move uncovers all of it.
+            isolated: the number of numbers (non-mine cells with mines
+                around them) that are not on the border of any opening, and
+                take a move each.
+            3bv: openings + isolated, the minimal number of moves that
+                clear the board (Bechtel's Board Benchmark Value).
+        The metrics describe the layout only: the states of the cells and
+        the ripple type of the board are ignored.
+
+        Everything is computed in one pass over the rows. The empty cells
+        of each row are found as runs, with C-level regular expression
+        matching, and every run is merged (union-find) with the runs of
+        the row above it that touch it, diagonals included, so the
+        openings are the runs minus the merges. The numbers next to an
+        empty cell are found with big integer bitmaps (one bit per cell,
+        as in to_bytes): the empty cells bitmap is shifted once to each
+        side, masking the cells that would wrap around a row, and then
+        once up and down. This takes O(cells) C-level work and O(rows +
+        runs) Python steps.
 
-        if self.get_value(row, column) != '0':
-            return sequence
+        Returns:
+            a dict from the metric names above to integers, or None if the
+            mines are deferred and not placed yet (see defer_mines). Note
+            this doesn't alters self.
 
-        queue = [(row, column)]
-        
-        while queue != []:
-            for i in range(len(queue)):
-                r, c = queue[0]
-                del queue[0]
-                
-                if self.get_value(r, c) == '0':
-                    neighbors = [(r-1, c), (r-1, c+1), (r, c+1), (r+1, c+1)]
-                    neighbors += [(r+1, c), (r+1, c-1), (r, c-1), (r-1, c-1)]
-                
-                    for (r,c) in neighbors:
-                        condition1 = (r,c) in self.board.keys() and (r,c) not in sequence
-                        condition2 = (r,c) != (row, column) and (r,c) not in self.uncovered
-                        if condition1 and condition2:
-                            sequence.append((r,c))
-                            queue.append((r,c))
-        
-        return sequence
+        """
+        if self._pending is not None:
+            return None
+        rows, columns, values = self.rows, self.columns, self._values
+
+        parent = []
+        merges = 0
+        above = []
+        for start in range(0, len(values), columns):
+            runs = []
+            k = 0
+            for run in self._EMPTY_RUN.finditer(values, start, start + columns):
+                first, last = run.start() - start, run.end() - start
+                label = len(parent)
+                parent.append(label)
+                # the runs above that end before first - 1 don't touch this
+                # run, nor any of the following runs of the row
+                while k < len(above) and above[k][1] < first:
+                    k += 1
+                j = k
+                while j < len(above) and above[j][0] <= last:
+                    root = above[j][2]
+                    while parent[root] != root:
+                        parent[root] = root = parent[parent[root]]
+                    if root != label:
+                        parent[root] = label
+                        merges += 1
+                    j += 1
+                runs.append((first, last, label))
+            above = runs
+        openings = len(parent) - merges
+
+        # a cell at index i is at bit len(values) - 1 - i, so shifting right
+        # by d moves every cell d cells forward
+        empty = int(values.translate(self._EMPTY_BIT_TABLE), 2)
+        numbers = int(values.translate(self._NUMBER_BIT_TABLE), 2)
+        notFirst = int(('0' + '1' * (columns - 1)) * rows, 2)
+        notLast = int(('1' * (columns - 1) + '0') * rows, 2)
+        near = empty | ((empty >> 1) & notFirst) | ((empty << 1) & notLast)
+        near |= (near >> columns) | (near << columns)
+        isolated = bin(numbers & ~near).count('1')
+
+        return {'openings': openings, 'isolated': isolated, '3bv': openings + isolated}
 
 class Game(object):
-    """Handles a game of minesweeper by supplying UI to Board object."""
+    """Handles a game of minesweeper by supplying UI to Board object.
+
+    The rendered rows of the board are cached, and a move re-renders only
+    the rows of the cells it uncovered (the cell and its ripple sequence).
+    Cells uncovered directly on the Board are noticed through its uncovered
+    count, and their rows are re-rendered too.
+
+    Besides uncovering a cell (make_move), a move can flag or unflag a cell
+    (flag), or chord on an uncovered number (chord).
+
+    The moves are kept in a journal: each entry is an (event, row, column,
+    cells) tuple, where event is 'M' for make_move, 'C' for chord or 'F'
+    for flag, and cells are the cells the move uncovered (the cell itself,
+    then its ripple sequence, or the chord sequence) or [(row, column)] for
+    a flag. The cells of a make_move on a non-mine cell are a CellSequence
+    (see Board.ripple_cells), so a move that uncovers most of a large board
+    keeps 4 bytes per cell. Undo covers the cells of the last entry (or
+    flips the flag back) and redo uncovers them again, both in O(cells),
+    and a move after an undo drops the undone entries. After save, every
+    move, undo and redo is also appended to a journal file next to the
+    board file (see load_game), with the cells it uncovered (see replay),
+    so autosaving a move writes a few bytes per cell it changed instead of
+    the whole board.
+    """
 
     def __init__(self, board):
         """Initializes a Game object with the given Board object.
@@ -412,6 +1499,20 @@ class Game(object):
 
         """
         self.board = board
+        # rendered rows and the uncovered cells they show (None until the
+        # first render), and the cells of the moves since then (a list of
+        # the cells of each move, and their count; None once they outnumber
+        # the cells of the board, see _note)
+        self._lines = None
+        self._known = None
+        self._flags = None
+        self._changes = []
+        self._changedCount = 0
+        # the entries up to position are applied, the rest can be redone
+        self.journal = []
+        self.position = 0
+        self.saveFile = None
+        self._savedPosition = 0
 
     def get_status(self):
         """Returns the current status of the game.
@@ -424,26 +1525,20 @@ class Game(object):
             Win: All non-mine cells are uncovered, and all mine cells are
             covered.
 
+        The status is read from the counters the Board keeps up to date, so
+        this takes O(1).
+
         Returns:
             one of GameStatus values (doesn't alters self)
 
         """
-        uncovered = self.board.getUncoveredCells()
-        if uncovered == []:
+        if self.board.getUncoveredCount() == 0:
             return GameStatus.NotStarted
 
-        rows, columns = self.board.getRows(), self.board.getColumns()
-
-        cells = [(r,c) for r in range(rows) for c in range(columns)]
-
-        Win = True
-        for (r,c) in cells:
-            if (r,c) in uncovered and self.board.get_value(r, c) == '*':
-                return GameStatus.Lose
-            if (r,c) not in uncovered and self.board.get_value(r, c) != '*':
-                Win = False
+        if self.board.getUncoveredMines() > 0:
+            return GameStatus.Lose
         
-        if Win:
+        if self.board.getHiddenSafeCount() == 0:
             return GameStatus.Win
 
         return GameStatus.InProgress
@@ -468,33 +1563,332 @@ class Game(object):
             IllegalMoveException, IllegalIndicesException (generated by Board)
 
         """
+        deferred = self.board.getPendingMines() != 0
         self.board.uncover(row, column)
         value = self.board.get_value(row, column)
+        cells = [(row, column)]
         
         if value != '*':
-            sequence = self.board.ripple_sequence(row, column)
-            for (r,c) in sequence:
+            # the ripple is kept as flat indices (see CellSequence), and
+            # listed after the cell itself
+            cells = self.board.ripple_cells(row, column)
+            for (r,c) in cells:
                 self.board.uncover(r,c)
-        
+            cells.indices.insert(0, row * cells.columns + column)
+
+        self._record('M', row, column, cells)
+        if deferred and self.saveFile is not None:
+            # the mines were just scattered, a replay can't redraw them
+            self.save(self.saveFile)
+        else:
+            self._appendMove('M', row, column, cells)
         return value
 
-    def printMenu(self):
-        rows, columns = self.board.getRows(), self.board.getColumns()
-        indexing = '  ' + str(range(columns))[1:-1].replace(',', ' ')
-
-        # print the current state of the board
-        print indexing
-        for r in range(rows):
-            line = str(r)
-            for c in range(columns):
-                line = line + ' '
-                if self.board.is_hidden(r, c) == 'H':
-                    line += 'H '
-                else:
-                    line += self.board.get_value(r, c) + ' '
-            print line
+    def chord(self, row, column):
+        """Makes a chord move on an uncovered number (see Board.chord_sequence).
+
+        All the cells of the chord sequence are uncovered in one pass. A
+        chord that has nothing to uncover is not a move, and is not kept in
+        the journal.
+
+        Args:
+            row: row index (integer)
+            column: column index (integer)
+
+        Returns:
+            the list of the (r,c) cells uncovered.
+
+        Raises:
+            IllegalMoveException, IllegalIndicesException (generated by Board)
+
+        """
+        cells = self.board.chord_sequence(row, column)
+        if not cells:
+            return cells
+        for (r, c) in cells:
+            self.board.uncover(r, c)
+        self._record('C', row, column, cells)
+        self._appendMove('C', row, column, cells)
+        return cells
+
+    def flag(self, row, column):
+        """Flags the given hidden cell, or unflags it if it is flagged.
+
+        Returns:
+            True if the cell is flagged now, and False otherwise.
+
+        Raises:
+            IllegalMoveException, IllegalIndicesException (generated by Board)
+
+        """
+        self._flip(row, column)
+        self._record('F', row, column, [(row, column)])
+        self._appendMove('F', row, column, None)
+        return self.board.is_flagged(row, column)
+
+    def _flip(self, row, column):
+        if self.board.is_flagged(row, column):
+            self.board.unflag(row, column)
+        else:
+            self.board.flag(row, column)
+
+    def _record(self, event, row, column, cells):
+        """Adds a move to the journal, dropping the undone moves."""
+        self._note(cells)
+        del self.journal[self.position:]
+        self.journal.append((event, row, column, cells))
+        self.position += 1
+
+    def _note(self, cells):
+        """Keeps the cells a move changed, for the next render (see _refresh).
+
+        Nothing is kept before the first render, which renders the whole
+        board. The kept cells are bounded by the cells of the board: past
+        that (a game that is played but not rendered, like a bot or an
+        undo/redo loop), they are dropped, and the next render compares the
+        whole board instead, which costs the same.
+        """
+        if self._lines is None or self._changes is None:
+            return
+        self._changedCount += len(cells)
+        if self._changedCount > self.board.getRows() * self.board.getColumns():
+            self._changes = None
+        else:
+            self._changes.append(cells)
+
+    def undo(self):
+        """Undoes the last move (that wasn't undone), covering its cells.
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalMoveException if there is no move to undo.
 
-        # print the game status
+        """
+        if self.position == 0:
+            raise IllegalMoveException
+        self.position -= 1
+        (event, row, column, cells) = self.journal[self.position]
+        if event == 'F':
+            self._flip(row, column)
+        else:
+            for (r, c) in reversed(cells):
+                self.board.cover(r, c)
+        self._note(cells)
+        if self.position < self._savedPosition and self.saveFile is not None:
+            # the journal file starts after this move, it can't undo it
+            self.save(self.saveFile)
+        else:
+            self._append('U\n')
+
+    def redo(self):
+        """Redoes the last undone move, uncovering its cells again.
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalMoveException if there is no move to redo.
+
+        """
+        if self.position == len(self.journal):
+            raise IllegalMoveException
+        (event, row, column, cells) = self.journal[self.position]
+        if event == 'F':
+            self._flip(row, column)
+        else:
+            for (r, c) in cells:
+                self.board.uncover(r, c)
+        self.position += 1
+        self._note(cells)
+        # the move may have been undone before the journal file started, so
+        # it is written as a new move, which changes the same cells
+        self._appendMove(event, row, column, cells)
+
+    def rewind(self, position):
+        """Undoes or redoes moves until position moves are applied.
+
+        A snapshot of the game is just its position, so rewinding to it
+        costs O(cells changed since then).
+
+        Raises:
+            IllegalMoveException if position is not in the journal.
+
+        """
+        if position < 0 or position > len(self.journal):
+            raise IllegalMoveException
+        while self.position > position:
+            self.undo()
+        while self.position < position:
+            self.redo()
+
+    def replay(self, lines):
+        """Applies the events of a journal file to the game.
+
+        A move or chord is applied by uncovering the cells written with it,
+        as they were uncovered when it was made, so the replay doesn't
+        depend on the ripple type of the board (see Board.set_ripple_type)
+        and doesn't ripple again.
+
+        Args:
+            lines: the lines of a journal file: "M row column cells" for a
+            move and "C row column cells" for a chord, where cells are the
+            flat indices (row * columns + column) of the cells it uncovered,
+            "F row column" for a flag (or their redos), and "U" for an
+            undo. A move or chord without cells is made again (see
+            make_move and chord). A last line without a newline (an
+            interrupted append) is ignored.
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            BoardFormatException if a line is not an event.
+            IllegalMoveException, IllegalIndicesException if an event
+            doesn't apply to the game.
+
+        """
+        moves = {'M': self.make_move, 'C': self.chord, 'F': self.flag}
+        for line in lines:
+            if not line.endswith('\n'):
+                break
+            event = line.split()
+            if event == ['U']:
+                self.undo()
+            elif len(event) < 3 or event[0] not in moves or not all(w.isdigit() for w in event[1:]):
+                raise BoardFormatException
+            elif len(event) == 3:
+                moves[event[0]](int(event[1]), int(event[2]))
+            elif event[0] == 'F':
+                raise BoardFormatException
+            else:
+                self._apply(event[0], int(event[1]), int(event[2]), event[3:])
+
+    def _apply(self, event, row, column, indices):
+        """Uncovers the cells of a replayed move, and adds it to the journal."""
+        cells = CellSequence(self.board.getColumns(), array.array(Board._INDEX_TYPE, map(int, indices)))
+        for (r, c) in cells:
+            self.board.uncover(r, c)
+        self._record(event, row, column, cells)
+
+    def enter_move(self, move):
+        """Makes a move given as the text entered in the game loop.
+
+        "row column" uncovers the cell (see make_move), "F row column" flags
+        or unflags it (see flag) and "C row column" chords on it (see chord).
+
+        Args:
+            move: the text of the move (whitespace separated)
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            ValueError if the text is not a move, and the exceptions of the
+            move.
+
+        """
+        words = move.split()
+        moves = {'F': self.flag, 'C': self.chord}
+        function = self.make_move
+        if len(words) == 3 and words[0].upper() in moves:
+            function = moves[words.pop(0).upper()]
+        if len(words) != 2:
+            raise ValueError('illegal move: %r' % (move,))
+        function(int(words[0]), int(words[1]))
+
+    def save(self, filename):
+        """Saves the board and starts a journal file next to it.
+
+        The board is saved atomically (see Board.save_board), and the empty
+        journal filename + '.journal' is created. Until the next save, the
+        moves, undos and redos are appended to the journal (the first move
+        on a board with deferred mines, and undoing a move made before the
+        save, save the board again instead).
+
+        Raises:
+            IOError in case of any file/IO related problem
+
+        """
+        self.board.save_board(filename, atomic=True)
+        Board._write(filename + '.journal', '', 'w', True)
+        self.saveFile = filename
+        self._savedPosition = self.position
+
+    def _append(self, event):
+        if self.saveFile is not None:
+            with open(self.saveFile + '.journal', 'a') as document:
+                document.write(event)
+
+    def _appendMove(self, event, row, column, cells):
+        """Appends a move to the journal file, with its cells (see replay)."""
+        if self.saveFile is None:
+            return
+        if event == 'F':
+            self._append('F %d %d\n' % (row, column))
+            return
+        if isinstance(cells, CellSequence):
+            indices = cells.indices
+        else:
+            columns = self.board.getColumns()
+            indices = [r * columns + c for (r, c) in cells]
+        self._append('%s %d %d %s\n' % (event, row, column, ' '.join(map(str, indices))))
+
+    def _renderRow(self, r):
+        cells = []
+        for c in range(self.board.getColumns()):
+            if self.board.is_hidden(r, c) == 'H':
+                cells.append(' F ' if self.board.is_flagged(r, c) else ' H ')
+            else:
+                cells.append(' ' + self.board.get_value(r, c) + ' ')
+        return str(r) + ''.join(cells)
+
+    def _refresh(self):
+        """Brings the rendered rows up to date.
+
+        Returns:
+            the sorted list of (r,c) cells that changed since the previous
+            refresh (all the uncovered cells on the first one)
+
+        """
+        board = self.board
+        if self._lines is None:
+            columns = board.getColumns()
+            self._lines = ['  ' + str(list(range(columns)))[1:-1].replace(',', ' ')]
+            self._lines += [self._renderRow(r) for r in range(board.getRows())]
+            self._known = set(board.getUncoveredCells())
+            self._flags = set(board.getFlaggedCells())
+            self._changes, self._changedCount = [], 0
+            return sorted(self._known | self._flags)
+
+        changed = set()
+        # the changes were dropped (see _note), all the cells are compared
+        compareAll = self._changes is None
+        for cells in self._changes or ():
+            for cell in cells:
+                if (self.board.is_hidden(*cell) == 'S') != (cell in self._known):
+                    changed.add(cell)
+                    self._known.symmetric_difference_update([cell])
+                if self.board.is_flagged(*cell) != (cell in self._flags):
+                    changed.add(cell)
+                    self._flags.symmetric_difference_update([cell])
+        self._changes, self._changedCount = [], 0
+        if compareAll or len(self._known) != board.getUncoveredCount():
+            # cells were uncovered on the board itself, not by make_move
+            shown = set(board.getUncoveredCells())
+            changed.update(shown.symmetric_difference(self._known))
+            self._known = shown
+        if compareAll or len(self._flags) != board.getFlagCount():
+            flags = set(board.getFlaggedCells())
+            changed.update(flags.symmetric_difference(self._flags))
+            self._flags = flags
+        for r in set(r for (r, c) in changed):
+            self._lines[r + 1] = self._renderRow(r)
+        return sorted(changed)
+
+    def _statusLines(self):
+        """Returns the game status and available actions lines."""
         statusEnum = self.get_status()
         status = ''
         if statusEnum == GameStatus.NotStarted:
@@ -505,16 +1899,46 @@ class Game(object):
             status = 'Lose'
         elif statusEnum == GameStatus.Win:
             status = 'Win'
-            
-        print 'Game status: %s'%status
 
-        # print the available actions
         availableActions = 'Available actions: (1) Save | (2) Exit | (3) Move'
-        if self.get_status() in [GameStatus.Win, GameStatus.Lose]:
+        if statusEnum in [GameStatus.Win, GameStatus.Lose]:
             availableActions = 'Available actions: (1) Save | (2) Exit'
-        print availableActions
+        return ['Game status: %s'%status, availableActions]
+
+    def getMenu(self):
+        """Returns the text printMenu prints, without a trailing newline.
+
+        This is the current state of the board, the game status and the
+        available actions, one per line. Only the rows that changed since
+        the previous getMenu/getDiff are rendered again.
+        """
+        self._refresh()
+        return '\n'.join(self._lines + self._statusLines())
+
+    def getDiff(self):
+        """Returns the changes since the previous getMenu/getDiff as text.
+
+        Every cell that changed is listed on its own line, in row-major
+        order, as "row column X", where X is the value of the cell (0-8 or
+        '*') or 'H' if it is hidden ('F' if it is also flagged). The game
+        status and available actions lines follow, as in getMenu. The first
+        call lists all the uncovered and flagged cells, i.e. the changes
+        from a fully hidden board.
+        """
+        lines = []
+        for (r, c) in self._refresh():
+            symbol = 'H'
+            if self.board.is_hidden(r, c) == 'S':
+                symbol = self.board.get_value(r, c)
+            elif self.board.is_flagged(r, c):
+                symbol = 'F'
+            lines.append('%d %d %s' % (r, c, symbol))
+        return '\n'.join(lines + self._statusLines())
 
-    def run(self):
+    def printMenu(self):
+        print(self.getMenu())
+
+    def run(self, diff=False):
         """Runs the game loop.
 
         At each turn, prints the following:
@@ -522,7 +1946,14 @@ class Game(object):
             game status
             available actions
         And then wait for input and act accordingly.
-        More details are in the project's description.
+        More details are in the project's description. A move can also be
+        prefixed with F to flag or unflag the cell, or with C to chord on it
+        (see enter_move). Saving saves the board and starts its journal (see
+        save), so the moves after it are autosaved.
+
+        Args:
+            diff: if True, print the whole board only on the first turn, and
+            then only the cells that changed (see getDiff)
 
         Returns:
             None
@@ -532,48 +1963,142 @@ class Game(object):
 
         """
 
+        first = True
         while True:
             # print board, game status and available options
-            self.printMenu()
+            if diff and not first:
+                print(self.getDiff())
+            else:
+                self.printMenu()
+            first = False
 
             # wait for user to select option
-            selection = raw_input("Enter selection: ")
+            selection = input("Enter selection: ")
             if selection == '1':
-                filename = raw_input("Enter filename: ")
+                filename = input("Enter filename: ")
                 try:
-                    self.board.save_board(filename)
+                    self.save(filename)
                 except:
-                    print 'Save operation failed'
+                    print('Save operation failed')
                 else:
-                    print 'Save operation done'
+                    print('Save operation done')
             elif selection == '2':
-                print 'Goodbye :)'
+                print('Goodbye :)')
                 return
             elif selection == '3' and self.get_status() not in [GameStatus.Win, GameStatus.Lose]:
-                move = raw_input('Enter row then column (space separated): ')
+                move = input('Enter row then column (space separated): ')
                 try:
-                    coordinates = move.split()
-                    if len(coordinates) != 2:
-                        print 'Illegal move values'
-                    else:
-                        r, c = int(coordinates[0]), int(coordinates[1])
-                        self.make_move(r, c)
+                    self.enter_move(move)
                 except:
-                    print 'Illegal move values'
+                    print('Illegal move values')
             else:
-                print 'Illegal choice'        
+                print('Illegal choice')
+
+def read_board(source, large=False):
+    """Reads a board saved by Board.save_board from a file object.
+
+    Args:
+        source: a file object opened for reading, at the start of the board
+        large: allow the dimensions of a large board (see Board)
+
+    Returns:
+        a new Board object
+
+    Raises:
+        ValueError if the dimensions are not integers, and the exceptions of
+        Board and Board.load_board.
+
+    """
+    rows = int(source.readline().strip())
+    columns = int(source.readline().strip())
+    board = Board(rows, columns, large)
+    board.load_board(source)
+    return board
+
+
+def load_game(filename, large=False):
+    """Loads a game saved by Game.save, replaying its journal.
+
+    If the journal file is missing, the game starts from the saved board.
+    The moves of the loaded game keep being appended to the journal, after
+    dropping a last event that was only partly written.
+
+    Args:
+        filename: the file name of the board
+        large: allow the dimensions of a large board (see Board)
+
+    Returns:
+        a new Game object
+
+    Raises:
+        the exceptions of read_board and Game.replay, and IOError in case of
+        any file/IO related problem
+
+    """
+    with open(filename, 'r') as document:
+        game = Game(read_board(document, large))
+    journalFile = filename + '.journal'
+    if os.path.exists(journalFile):
+        with open(journalFile, 'r+') as document:
+            game.replay(document)
+            document.seek(0)
+            complete = document.read().rfind('\n') + 1
+            document.truncate(complete)
+    game.saveFile = filename
+    return game
+
+
+def convert_board(source, target, large=False):
+    """Converts a saved board file between the text and binary formats.
+
+    The format of source is detected from its first bytes: a binary board is
+    saved as text (see Board.save_board), and a text board is saved in the
+    compact binary format (see Board.save_binary).
+
+    Args:
+        source: the file name of the board to convert
+        target: the file name to write the converted board to
+        large: allow the dimensions of a large board (see Board)
+
+    Returns:
+        None
+
+    Raises:
+        the exceptions of read_board and Board.load_binary, and IOError in
+        case of any file/IO related problem
+
+    """
+    with open(source, 'rb') as document:
+        binary = document.read(len(Board._MAGIC)) == Board._MAGIC
+    if binary:
+        Board.load_binary(source, large).save_board(target)
+    else:
+        with open(source, 'r') as document:
+            read_board(document, large).save_binary(target)
+
 
 def main():
     """Starts the game by parsing the arguments and initializing.
 
     If an input file argument was given, the file is loaded (even if other
-    legal command line argument were given). If any error occurs while parsing
-    the input file and creating the board, print "Badly-formatted input file"
-    and return (None).
+    legal command line argument were given), with the moves of its journal
+    file if it was saved by the game (see load_game). If any error occurs
+    while parsing the input file and creating the board, print
+    "Badly-formatted input file" and return (None).
 
     If input file wasn't given, create a board with the rows/columns/mines
     values given (if legal), and if not print
-    "Illegal rows/columns/mines values" and return.
+    "Illegal rows/columns/mines values" and return. The mines are deferred
+    to the first move (see Board.defer_mines), so it never hits a mine.
+    There is no board pool (see pool.BoardPool) for this single game: it
+    would only race the generation of its one board against the first
+    move.
+    The large flag lifts the 20x50 board size limit (see Board), both for
+    loaded and for new boards. The diff flag prints only the changed cells
+    after the first turn (see Game.run). The profile flag records the
+    statistics of the Board and Game operations (see profiling.Profiler) and
+    prints them to stderr when the game ends, or writes them as JSON to the
+    given file.
     In case both an input file was given and other parameters, ignore the
     others (if they passes argparse legality check), and use only the input
     file. For example, in case we get "-i sample -r 2 -c a" argparse should
@@ -599,26 +2124,44 @@ def main():
     parser.add_argument('-r', "--rows", type=int, default=1)
     parser.add_argument('-c', "--columns", type=int, default=2)
     parser.add_argument('-m', "--mines", type=int, default=1)
+    parser.add_argument('-l', "--large", action='store_true')
+    parser.add_argument('-d', "--diff", action='store_true')
+    parser.add_argument('-p', "--profile", nargs='?', const='-')
     args = parser.parse_args()
-    
+
+    profiler = None
+    if args.profile is not None:
+        import profiling
+        profiler = profiling.Profiler(sys.modules[__name__])
+        profiler.enable()
+    try:
+        play(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            if args.profile == '-':
+                sys.stderr.write(profiler.report() + '\n')
+            else:
+                profiler.dump(args.profile)
+
+
+def play(args):
+    """Loads or creates the board of the parsed arguments and runs the game."""
     if args.input != None:
+        # argparse opened the file to check it, load_game reads it by name
+        args.input.close()
         try:
-            source = args.input
-            rows = int(source.readline().strip())
-            columns = int(source.readline().strip())
-            lines = source.readlines()
-            board = Board(rows, columns)
-            board.load_board(lines)
+            game = load_game(args.input.name, args.large)
         except:
-            print 'Badly-formatted input file'
+            print('Badly-formatted input file')
             return
     else:
         rows, columns, mines = args.rows, args.columns, args.mines
-        board = Board(rows, columns)
-        board.put_mines(mines)
+        board = Board(rows, columns, args.large)
+        board.defer_mines(mines)
+        game = Game(board)
 
-    game = Game(board)
-    game.run()
+    game.run(args.diff)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,180 @@
+"""A pool of boards generated in advance, by a background thread.
+
+Generating a board (put_mines) takes time proportional to its cells, and a
+no-guess board (see solver.generate_no_guess) takes much longer. A
+BoardPool keeps boards of the recently used configurations ready, so a new
+game takes one instead of generating it on the request path:
+    get(rows, columns, mines) pops a ready board of the configuration (a
+        hit), or generates one on the spot when there is none (a miss).
+        Either way the worker thread then refills the configuration.
+    prefetch(rows, columns, mines) only asks the worker to fill the
+        configuration, e.g. while a player looks at a new game.
+The worker keeps up to depth boards of each configuration, filling the most
+recently used configurations first. All the configurations share one
+capacity: when it is full, a board of the least recently used
+configuration is evicted to make room for a more recent one.
+
+Games take pool boards through Board.defer_mines, so the first move is still
+safe: the first uncover takes a board from the pool and only moves the few
+mines around the uncovered cell.
+
+The worker is a thread, so it shares the interpreter with the games. The
+NumPy generation releases the interpreter for most of its work, and the
+pure Python one is still taken off the request path.
+"""
+import collections
+import threading
+
+import minesweeper
+
+
+def generate(rows, columns, mines, large):
+    """The default factory: a new Board with randomly scattered mines."""
+    board = minesweeper.Board(rows, columns, large)
+    board.put_mines(mines)
+    return board
+
+
+class BoardPool(object):
+    """Ready boards of recently used configurations, refilled in the background."""
+
+    def __init__(self, capacity=64, depth=4, factory=generate):
+        """Initializes a pool and starts its worker thread.
+
+        Args:
+            capacity: the maximal number of ready boards, over all the
+            configurations
+            depth: the number of ready boards the worker keeps for each
+            configuration
+            factory: factory(rows, columns, mines, large) returns a new
+            board of the configuration (default: generate)
+
+        Returns:
+            None (alters self)
+
+        """
+        self.capacity, self.depth, self.factory = capacity, depth, factory
+        self.hits = self.misses = self.evictions = 0
+        # configuration -> ready boards, from the least recently used
+        self._boards = collections.OrderedDict()
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name='BoardPool')
+        self._worker.daemon = True
+        self._worker.start()
+
+    def get(self, rows, columns, mines, large=False):
+        """Returns a new board of the given configuration.
+
+        Returns:
+            a ready board if there is one, or a board generated now
+
+        Raises:
+            the exceptions of the factory (SizeOutOfBoundException,
+            ScatterException for the default one) if the configuration is
+            illegal; it is then forgotten by the pool.
+
+        """
+        config = (rows, columns, mines, large)
+        with self._condition:
+            boards = self._use(config)
+            if boards:
+                self.hits += 1
+                self._size -= 1
+                return boards.popleft()
+            self.misses += 1
+        try:
+            return self.factory(*config)
+        except Exception:
+            self._forget(config)
+            raise
+
+    def prefetch(self, rows, columns, mines, large=False):
+        """Asks the worker to fill the configuration, without taking a board."""
+        with self._condition:
+            self._use((rows, columns, mines, large))
+
+    def _use(self, config):
+        """Marks the configuration as the most recently used, and wakes the worker."""
+        boards = self._boards.pop(config, None)
+        if boards is None:
+            boards = collections.deque()
+        self._boards[config] = boards
+        self._condition.notify()
+        return boards
+
+    def _forget(self, config):
+        with self._condition:
+            boards = self._boards.pop(config, None)
+            if boards:
+                self._size -= len(boards)
+
+    def stats(self):
+        """Returns the counters of the pool.
+
+        Returns:
+            a dict with the hits, misses, evictions, ready (the number of
+            ready boards) and configurations (the number of them)
+
+        """
+        with self._condition:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'ready': self._size, 'configurations': len(self._boards)}
+
+    def _next(self):
+        """Returns the configuration to fill next, or None if there is none.
+
+        That's the most recently used configuration with less than depth
+        boards. When the pool is full, a board of the least recently used
+        configuration that has boards is evicted to make room, but only if
+        it is less recent than the one to fill.
+        """
+        configs = list(self._boards)
+        for (k, config) in enumerate(reversed(configs)):
+            if len(self._boards[config]) >= self.depth:
+                continue
+            if self._size < self.capacity:
+                return config
+            for victim in configs[:len(configs) - 1 - k]:
+                if self._boards[victim]:
+                    self._boards[victim].popleft()
+                    self._size -= 1
+                    self.evictions += 1
+                    return config
+            return None
+        return None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                config = self._next()
+                while config is None and not self._closed:
+                    self._condition.wait()
+                    config = self._next()
+                if self._closed:
+                    return
+            try:
+                board = self.factory(*config)
+            except Exception:
+                self._forget(config)
+                continue
+            with self._condition:
+                boards = self._boards.get(config)
+                if boards is not None and self._size < self.capacity:
+                    boards.append(board)
+                    self._size += 1
+                # configurations without boards are dropped once there are
+                # more of them than the pool can hold boards
+                while len(self._boards) > self.capacity:
+                    oldest = next(iter(self._boards))
+                    if self._boards[oldest]:
+                        break
+                    del self._boards[oldest]
+
+    def close(self):
+        """Stops the worker thread (the ready boards can still be taken)."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
@@ -0,0 +1,204 @@
+"""Opt-in instrumentation of the Board and Game hot paths.
+
+A Profiler records, for every instrumented operation, the number of calls,
+their total and maximum latency, a latency histogram and the number of
+cells each call touched:
+    put_mines, load_board, save_board: the cells of the board
+    place_mines: the cells of the board; this is the mine generation
+        itself (Board._place and Board._adopt, the lazy NumPy import
+        included), both of put_mines and of the first move on a board with
+        deferred mines (see Board.defer_mines), which is how the game and
+        the server place their mines, so put_mines shows no calls there
+    ripple_cells: the cells in the sequence (the ripples of make_move, and
+        the ripple_sequence calls, which go through ripple_cells)
+    make_move: the cells the move uncovered (the cell and its ripple)
+    get_status: none (it reads the board counters)
+The operations are instrumented by replacing the methods on the Board and
+Game classes (of minesweeper, and of the __main__ module when the game
+runs as a script) with timing wrappers while the profiler is enabled, and
+the original methods are put back when it is disabled, so a disabled
+profiler costs nothing at all. The wrappers are thread safe (the server
+runs moves on a thread pool, and a board pool generates boards in a
+thread).
+
+The histogram has a bucket per power of two microseconds: bucket k counts
+the calls that took from 2**(k-1) up to 2**k microseconds (bucket 0 counts
+the calls under a microsecond), so a few huge ripples stand out as calls in
+the high buckets even among millions of fast moves.
+
+Usage:
+    profiler = profiling.Profiler()
+    profiler.enable()
+    ...
+    profiler.disable()
+    print(profiler.report())
+or the --profile flag of minesweeper.py and server.py.
+"""
+import json
+import threading
+import timeit
+
+import minesweeper
+
+
+def _boardCells(board, args, result):
+    return board.getRows() * board.getColumns()
+
+
+def _rippleCells(board, args, result):
+    return len(result)
+
+
+def _moveCells(game, args, result):
+    return len(game.journal[game.position - 1][3])
+
+
+def _noCells(subject, args, result):
+    return 0
+
+
+class Profiler(object):
+    """Records statistics of the Board and Game operations while enabled."""
+
+    # (class name, method name, operation name, cells touched by a call)
+    OPERATIONS = (
+        ('Board', 'put_mines', 'put_mines', _boardCells),
+        ('Board', '_place', 'place_mines', _boardCells),
+        ('Board', '_adopt', 'place_mines', _boardCells),
+        ('Board', 'load_board', 'load_board', _boardCells),
+        ('Board', 'save_board', 'save_board', _boardCells),
+        ('Board', 'ripple_cells', 'ripple_cells', _rippleCells),
+        ('Game', 'make_move', 'make_move', _moveCells),
+        ('Game', 'get_status', 'get_status', _noCells),
+    )
+    BUCKETS = 32
+
+    def __init__(self, module=None):
+        """Initializes a disabled profiler.
+
+        Args:
+            module: the module whose Board and Game classes to instrument
+            (default: minesweeper; minesweeper.py run as a script passes
+            its __main__ module). The classes of the minesweeper module are
+            always instrumented too: when the game runs as a script, the
+            modules it uses (pool, solver...) import minesweeper as a second
+            copy, and make their boards from its classes.
+
+        """
+        self.module = module or minesweeper
+        self.modules = [self.module]
+        if self.module is not minesweeper:
+            self.modules.append(minesweeper)
+        self._lock = threading.Lock()
+        self._originals = None
+        self.reset()
+
+    def reset(self):
+        """Clears the statistics of all the operations."""
+        with self._lock:
+            self._stats = {}
+            for (className, method, name, cells) in self.OPERATIONS:
+                self._stats[name] = {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                                     'cells': 0, 'max_cells': 0, 'histogram': [0] * self.BUCKETS}
+
+    def is_enabled(self):
+        return self._originals is not None
+
+    def enable(self):
+        """Starts recording, by wrapping the instrumented methods.
+
+        Only one profiler should be enabled at a time (a second one would
+        wrap the wrappers of the first, and time them too).
+
+        Raises:
+            ValueError if the profiler is already enabled.
+
+        """
+        if self._originals is not None:
+            raise ValueError('the profiler is already enabled')
+        self._originals = []
+        for module in self.modules:
+            for (className, methodName, name, cells) in self.OPERATIONS:
+                cls = getattr(module, className)
+                method = cls.__dict__[methodName]
+                self._originals.append((cls, methodName, method))
+                setattr(cls, methodName, self._wrap(name, method, cells))
+
+    def disable(self):
+        """Stops recording, putting the original methods back.
+
+        The statistics are kept until reset.
+        """
+        if self._originals is None:
+            return
+        for (cls, name, method) in self._originals:
+            setattr(cls, name, method)
+        self._originals = None
+
+    def _wrap(self, name, method, cells):
+        record, clock = self._record, timeit.default_timer
+
+        def timed(subject, *args, **kwargs):
+            start = clock()
+            result = method(subject, *args, **kwargs)
+            record(name, clock() - start, cells(subject, args, result))
+            return result
+
+        timed.__name__, timed.__doc__ = method.__name__, method.__doc__
+        return timed
+
+    def _record(self, name, seconds, cells):
+        bucket = min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)
+        with self._lock:
+            stats = self._stats[name]
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['cells'] += cells
+            stats['max_cells'] = max(stats['max_cells'], cells)
+            stats['histogram'][bucket] += 1
+
+    def snapshot(self):
+        """Returns a copy of the statistics.
+
+        Returns:
+            a dict from operation name to a dict with the keys calls,
+            seconds (total), max_seconds, cells (total), max_cells and
+            histogram (a list of BUCKETS call counts, see the module
+            documentation)
+
+        """
+        with self._lock:
+            return dict((name, dict(stats, histogram=list(stats['histogram'])))
+                        for (name, stats) in self._stats.items())
+
+    def report(self):
+        """Returns the statistics as a human readable table."""
+        lines = ['%-16s %9s %12s %12s %12s %10s' % ('operation', 'calls', 'mean ms', 'max ms',
+                                                     'cells', 'max cells')]
+        snapshot = self.snapshot()
+        names = []
+        for (className, method, name, cells) in self.OPERATIONS:
+            if name not in names:
+                names.append(name)
+        for name in names:
+            stats = snapshot[name]
+            mean = stats['seconds'] / stats['calls'] if stats['calls'] else 0.0
+            lines.append('%-16s %9d %12.4f %12.4f %12d %10d' % (
+                name, stats['calls'], 1000 * mean, 1000 * stats['max_seconds'],
+                stats['cells'], stats['max_cells']))
+            buckets = ['<%dus: %d' % (2 ** k, count) for (k, count) in enumerate(stats['histogram'])
+                       if count]
+            if buckets:
+                lines.append('    ' + ', '.join(buckets))
+        return '\n'.join(lines)
+
+    def dump(self, filename):
+        """Writes the snapshot to filename as JSON.
+
+        Raises:
+            IOError in case of any file/IO related problem
+
+        """
+        with open(filename, 'w') as document:
+            json.dump(self.snapshot(), document, indent=1, sort_keys=True)
@@ -0,0 +1,256 @@
+"""The original Board and Game implementation, kept as a reference oracle.
+
+These are the first, straightforward versions of Board and Game: the cells
+are a dict from (r,c) to their value and a list of the uncovered cells, and
+every operation is written the obvious way, with no attention to speed.
+They define the semantics the optimized engines in minesweeper.py (and the
+other engines built on it) must keep, and differential.py compares the two.
+Don't optimize this module.
+
+The original only had the Queue ripple; the Simple and Recursive ripples
+here are direct transcriptions of the ripple_sequence documentation. The
+extensions of the optimized engine (large boards, deferred mines, flags,
+the binary format...) have no counterpart here. The exceptions are the ones
+of minesweeper.py, so the outcomes of the two can be compared.
+"""
+import random
+
+from minesweeper import (GameStatus, RippleTypes, SizeOutOfBoundException, ScatterException,
+                         BoardFormatException, DimensionsMismatchException,
+                         IllegalIndicesException, IllegalMoveException)
+
+
+class Board(object):
+    """Represents a board of minesweeper game and its current progress."""
+
+    def __init__(self, rows, columns, ripple_type=RippleTypes.Queue):
+        if rows < 1 or rows > 20 or columns < 2 or columns > 50:
+            raise SizeOutOfBoundException
+
+        self.rows, self.columns = rows, columns
+        self.rippleType = ripple_type
+        self.startState = True
+        self.board = {}
+        self.uncovered = []
+        cells = [(r,c) for r in range(self.rows) for c in range(self.columns)]
+        for (r,c) in cells:
+            self.board.update({(r,c):0})
+
+    def getRows(self):
+        return self.rows
+
+    def getColumns(self):
+        return self.columns
+
+    def getUncoveredCells(self):
+        return self.uncovered
+
+    def updateCell(self, r, c):
+        neighbors = [(r-1, c-1), (r-1, c), (r-1, c+1), (r, c-1), (r, c+1), (r+1, c-1), (r+1, c), (r+1, c+1)]
+        neighbors = [(row, col) for (row, col) in neighbors if (row, col) in self.board.keys()]
+        self.board[(r,c)] = len([(row, col) for (row, col) in neighbors if self.board[(row, col)] == '*'])
+
+    def put_mines(self, mines):
+        """Randomly scatter the requested number of mines on the board."""
+        if mines < 1 or mines > (self.rows*self.columns-1) or (not self.startState):
+            raise ScatterException
+
+        for i in range(mines):
+            scattered = False
+            while not scattered:
+                r = random.randint(0, self.rows-1)
+                c = random.randint(0, self.columns-1)
+                if self.board[(r,c)] != '*':
+                    self.board[(r,c)] = '*'
+                    scattered = True
+
+        for (r,c) in self.board.keys():
+            if self.board[(r,c)] != '*':
+                self.updateCell(r, c)
+
+        self.startState = False
+
+    def load_board(self, lines):
+        """Loads a board from a sequence of lines (see minesweeper.Board)."""
+        lines = [line.strip() for line in lines if line.strip() != '']
+        if lines == []:
+            raise BoardFormatException
+
+        legalValues = ['0','1','2','3','4','5','6','7','8','*']
+        legalStates = ['H', 'S']
+        newBoard, newUncovered, pairs = {}, [], []
+
+        dimensionsError = False
+        if len(lines) != self.rows:
+            dimensionsError = True
+
+        for r in range(len(lines)):
+            pairs = lines[r].split(' ')
+            if len(pairs) != self.columns:
+                dimensionsError = True
+            for c in range(len(pairs)):
+                elements = list(pairs[c])
+                if len(elements) != 2:
+                    raise BoardFormatException
+                if elements[0] not in legalValues or elements[1] not in legalStates:
+                    raise BoardFormatException
+
+                if elements[0] == '*':
+                    newBoard.update({(r,c):elements[0]})
+                else:
+                    newBoard.update({(r,c):int(elements[0])})
+
+                if elements[1] == 'S':
+                    newUncovered.append((r,c))
+
+        if dimensionsError:
+            raise DimensionsMismatchException
+
+        self.board = newBoard
+        self.uncovered = newUncovered
+
+    def save_board(self, filename):
+        """Saves a Board object to a text file (see minesweeper.Board)."""
+        document = open(filename, 'w')
+        document.write(str(self.rows) + '\n')
+        document.write(str(self.columns) + '\n')
+
+        lines = []
+
+        for r in range(self.rows):
+            line = ''
+            for c in range(self.columns):
+                value = self.board[(r,c)]
+                state = 'H'
+                if (r,c) in self.uncovered:
+                    state = 'S'
+                line += str(value) + state + ' '
+            line += '\n'
+            lines.append(line)
+
+        document.writelines(lines)
+        document.close()
+
+    def get_value(self, row, column):
+        if (row, column) not in self.board.keys():
+            raise IllegalIndicesException
+        return str(self.board[(row, column)])
+
+    def is_hidden(self, row, column):
+        retval = 'H'
+        if (row, column) not in self.board.keys():
+            raise IllegalIndicesException
+        if (row, column) in self.uncovered:
+            retval = 'S'
+        return retval
+
+    def uncover(self, row, column):
+        if (row, column) not in self.board.keys():
+            raise IllegalIndicesException
+        if (row, column) in self.uncovered:
+            raise IllegalMoveException
+        self.uncovered.append((row, column))
+
+    def get_ripple_type(self):
+        return self.rippleType
+
+    def _around(self, r, c):
+        """Returns the cells around (r,c) clockwise from the one above."""
+        neighbors = [(r-1, c), (r-1, c+1), (r, c+1), (r+1, c+1)]
+        neighbors += [(r+1, c), (r+1, c-1), (r, c-1), (r-1, c-1)]
+        return [(row, col) for (row, col) in neighbors if (row, col) in self.board.keys()]
+
+    def _simple(self, row, column):
+        sequence = []
+        for (dr, dc) in [(-1, 0), (0, 1), (1, 0), (0, -1)]:
+            r, c = row + dr, column + dc
+            while (r,c) in self.board.keys() and (r,c) not in self.uncovered:
+                sequence.append((r,c))
+                if self.get_value(r, c) != '0':
+                    break
+                r, c = r + dr, c + dc
+        return sequence
+
+    def _recursive(self, r, c, sequence, start):
+        for (row, col) in self._around(r, c):
+            if (row, col) != start and (row, col) not in sequence and (row, col) not in self.uncovered:
+                sequence.append((row, col))
+                if self.get_value(row, col) == '0':
+                    self._recursive(row, col, sequence, start)
+        return sequence
+
+    def ripple_sequence(self, row, column):
+        """Returns the ripple sequence starting on the specified cell.
+
+        See minesweeper.Board.ripple_sequence for the three orders.
+        """
+        sequence = []
+
+        if self.get_value(row, column) != '0':
+            return sequence
+
+        if self.rippleType == RippleTypes.Simple:
+            return self._simple(row, column)
+        if self.rippleType == RippleTypes.Recursive:
+            return self._recursive(row, column, sequence, (row, column))
+
+        queue = [(row, column)]
+
+        while queue != []:
+            for i in range(len(queue)):
+                r, c = queue[0]
+                del queue[0]
+
+                if self.get_value(r, c) == '0':
+                    neighbors = [(r-1, c), (r-1, c+1), (r, c+1), (r+1, c+1)]
+                    neighbors += [(r+1, c), (r+1, c-1), (r, c-1), (r-1, c-1)]
+
+                    for (r,c) in neighbors:
+                        condition1 = (r,c) in self.board.keys() and (r,c) not in sequence
+                        condition2 = (r,c) != (row, column) and (r,c) not in self.uncovered
+                        if condition1 and condition2:
+                            sequence.append((r,c))
+                            queue.append((r,c))
+
+        return sequence
+
+
+class Game(object):
+    """Handles a game of minesweeper on a reference Board."""
+
+    def __init__(self, board):
+        self.board = board
+
+    def get_status(self):
+        """Returns the current status of the game (see minesweeper.Game)."""
+        uncovered = self.board.getUncoveredCells()
+        if uncovered == []:
+            return GameStatus.NotStarted
+
+        rows, columns = self.board.getRows(), self.board.getColumns()
+
+        cells = [(r,c) for r in range(rows) for c in range(columns)]
+
+        Win = True
+        for (r,c) in cells:
+            if (r,c) in uncovered and self.board.get_value(r, c) == '*':
+                return GameStatus.Lose
+            if (r,c) not in uncovered and self.board.get_value(r, c) != '*':
+                Win = False
+
+        if Win:
+            return GameStatus.Win
+
+        return GameStatus.InProgress
+
+    def make_move(self, row, column):
+        """Makes a move by uncovering the given cell and unrippling it's area."""
+        self.board.uncover(row, column)
+        value = self.board.get_value(row, column)
+
+        if value != '*':
+            sequence = self.board.ripple_sequence(row, column)
+            for (r,c) in sequence:
+                self.board.uncover(r,c)
+
+        return value
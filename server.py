@@ -0,0 +1,240 @@
+"""Asyncio server hosting many minesweeper games over a line protocol.
+
+Every connection plays its own Game, with the same dialog as Game.run: the
+server sends the menu (see Game.getMenu) followed by a prompt, and the
+client answers every prompt with one line:
+    Enter selection: 1 (Save), 2 (Exit) or 3 (Move)
+    Enter filename: after 1; the board is saved under that base name in
+        the save directory of the server (saving fails if there is none)
+    Enter row then column (space separated): after 3, optionally
+        prefixed with F to flag the cell or C to chord on it
+The messages are the ones Game.run prints, so a terminal client such as
+netcat plays like the local game. In diff mode only the first menu shows
+the whole board, and the following ones list the changed cells (see
+Game.getDiff). The mines of a new game are deferred to
+its first move (see Board.defer_mines), so idle sessions cost one small
+board each, and thousands of them fit in one process. With a board pool,
+the first moves take boards generated in advance by a background thread
+(see pool.BoardPool) instead of generating them.
+
+All the sessions share one event loop. On boards larger than the regular
+size limit moves and menus run in a thread pool, and so do all saves, so
+one big ripple or a slow disk doesn't stall the other sessions.
+
+This module needs Python 3 (asyncio).
+
+Usage:
+    python3 server.py -r 16 -c 30 -m 99 --port 8023
+    python3 server.py -r 16 -c 30 -m 99 --unix /tmp/minesweeper.sock
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import sys
+
+import minesweeper
+import pool
+import profiling
+
+
+class Server(object):
+    """Hosts a Game per connection, all with the same board configuration."""
+
+    # moves and menus of boards with more cells run in the thread pool
+    OFFLOAD_CELLS = minesweeper.Board.MAX_ROWS * minesweeper.Board.MAX_COLUMNS
+    # pending connections, so bursts of thousands of clients are not dropped
+    BACKLOG = 1024
+
+    def __init__(self, rows, columns, mines, large=False, save_directory=None, workers=None,
+                 diff=False, boards=None):
+        """Initializes a server of games with the given configuration.
+
+        Args:
+            rows, columns, mines: the configuration of every new game
+            large: allow the dimensions of a large board (see Board)
+            save_directory: the directory sessions save their boards in, or
+            None to fail every save
+            workers: the number of threads for moves and saves (default:
+            chosen by concurrent.futures)
+            diff: send only the changed cells after the first menu
+            boards: an optional pool.BoardPool the games take their mines
+            from
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            SizeOutOfBoundException, ScatterException if the configuration
+            is illegal (see Board).
+
+        """
+        self._newBoard(rows, columns, mines, large, None)
+        self.rows, self.columns, self.mines = rows, columns, mines
+        self.large = large
+        self.boards = boards
+        if boards is not None:
+            boards.prefetch(rows, columns, mines, large)
+        self.saveDirectory = save_directory
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self.diff = diff
+        self.sessions = 0
+
+    @staticmethod
+    def _newBoard(rows, columns, mines, large, boards):
+        board = minesweeper.Board(rows, columns, large)
+        board.defer_mines(mines, pool=boards)
+        return board
+
+    async def handle(self, reader, writer):
+        """Plays one session on a connection, until Exit or disconnection."""
+        self.sessions += 1
+        try:
+            game = minesweeper.Game(self._newBoard(self.rows, self.columns, self.mines, self.large,
+                                                   self.boards))
+            await self._play(game, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            # the client reset the connection, as it may during the session
+            pass
+
+    async def _board(self, function, *args):
+        """Calls function(*args), in the thread pool if the boards are large."""
+        if self.rows * self.columns > self.OFFLOAD_CELLS:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, function, *args)
+        return function(*args)
+
+    async def _play(self, game, reader, writer):
+        """Runs the dialog of Game.run over the connection."""
+        loop = asyncio.get_running_loop()
+
+        async def ask(prompt):
+            writer.write(prompt.encode())
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise asyncio.IncompleteReadError(line, None)
+            return line.decode('utf-8', 'replace').rstrip('\r\n')
+
+        def say(message):
+            writer.write((message + '\n').encode())
+
+        menu = game.getMenu
+        while True:
+            say(await self._board(menu))
+            if self.diff:
+                menu = game.getDiff
+            selection = await ask('Enter selection: ')
+            if selection == '1':
+                filename = await ask('Enter filename: ')
+                try:
+                    await loop.run_in_executor(self.executor, self._save, game.board, filename)
+                except Exception:
+                    say('Save operation failed')
+                else:
+                    say('Save operation done')
+            elif selection == '2':
+                say('Goodbye :)')
+                await writer.drain()
+                return
+            elif selection == '3' and game.get_status() not in [minesweeper.GameStatus.Win,
+                                                                 minesweeper.GameStatus.Lose]:
+                move = await ask('Enter row then column (space separated): ')
+                try:
+                    await self._board(game.enter_move, move)
+                except Exception:
+                    say('Illegal move values')
+            else:
+                say('Illegal choice')
+
+    def _save(self, board, filename):
+        """Saves board in the save directory, under the base name of filename."""
+        name = os.path.basename(filename)
+        if self.saveDirectory is None or name in ('', '.', '..'):
+            raise IOError('saving is disabled')
+        board.save_board(os.path.join(self.saveDirectory, name), atomic=True)
+
+    async def start(self, host='127.0.0.1', port=8023, path=None):
+        """Starts listening on a TCP port, or on a Unix socket if path is given.
+
+        Returns:
+            the asyncio server object (see asyncio.start_server)
+
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path, backlog=self.BACKLOG)
+        return await asyncio.start_server(self.handle, host, port, backlog=self.BACKLOG)
+
+
+def main():
+    """Runs a server according to the command line arguments.
+
+    Prints "Illegal rows/columns/mines values" if the board configuration is
+    illegal. The pool flag sets the number of boards a board pool keeps
+    ready (by default there is no pool). With the profile flag, the
+    statistics of the Board and Game operations of all the sessions are
+    recorded (see profiling.Profiler), and printed to stderr when the server
+    stops, or written as JSON to the given file.
+
+    Returns:
+        None
+
+    Raises:
+        Nothing
+
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', "--rows", type=int, required=True)
+    parser.add_argument('-c', "--columns", type=int, required=True)
+    parser.add_argument('-m', "--mines", type=int, required=True)
+    parser.add_argument('-l', "--large", action='store_true')
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument('-p', "--port", type=int, default=8023)
+    parser.add_argument('-u', "--unix")
+    parser.add_argument('-s', "--save-dir")
+    parser.add_argument('-w', "--workers", type=int, default=None)
+    parser.add_argument('-d', "--diff", action='store_true')
+    parser.add_argument("--profile", nargs='?', const='-')
+    parser.add_argument('-b', "--pool", type=int, default=0)
+    args = parser.parse_args()
+
+    boards = pool.BoardPool(args.pool, args.pool) if args.pool > 0 else None
+    try:
+        server = Server(args.rows, args.columns, args.mines, args.large, args.save_dir, args.workers,
+                        args.diff, boards)
+    except (minesweeper.SizeOutOfBoundException, minesweeper.ScatterException):
+        print('Illegal rows/columns/mines values')
+        return
+
+    async def serve():
+        listener = await server.start(args.host, args.port, args.unix)
+        async with listener:
+            await listener.serve_forever()
+
+    profiler = profiling.Profiler()
+    if args.profile is not None:
+        profiler.enable()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if boards is not None:
+            boards.close()
+        if profiler.is_enabled():
+            profiler.disable()
+            if args.profile == '-':
+                sys.stderr.write(profiler.report() + '\n')
+            else:
+                profiler.dump(args.profile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,673 @@
+"""A sparse board for huge maps, whose memory grows with the explored area.
+
+A Board stores every cell, so its memory grows with the size of the board
+even if most of it is never played. A SparseBoard keeps the same contract
+(get_value, is_hidden, uncover, cover, flag, ripple_sequence,
+chord_sequence and the status counters, so a Game can be played on it) for
+boards of up to MAX_ROWS x MAX_COLUMNS cells, and only stores the parts of
+the board that were looked at. The board is cut into tiles of TILE x TILE
+cells:
+    mines: the mines of a tile are kept as a mask (a byte per cell, 1 for
+        a mine), which is made when a cell of the tile or next to it is
+        first read. put_mines only records the number of mines and a seed,
+        and the mines of every tile are drawn from the seed and the tile,
+        so they are the same whenever they are drawn (see _drawTile).
+    tiles: the values and states of the cells of a tile (two bytes per
+        cell, like Board) are allocated when one of its cells is uncovered
+        or flagged. The values of a new tile are counted from the mines of
+        the tile and of the cells around it in the eight tiles around it.
+    the value of a cell of a tile that isn't allocated is counted on demand
+        from the mines around it, so reading the board (and rippling over
+        it) allocates no tiles.
+The cells are addressed by (row, column) everywhere, so the ripples cross
+the tiles without noticing them, and list the cells in the order Board
+does. A ripple still takes O(region), so the mines should be dense enough
+for the openings to stay small (on a huge board with very few mines, the
+first move uncovers most of it).
+
+The text and binary formats of Board store every cell, so there are no
+save and load methods here. A SparseBoard with the mines and states of a
+Board behaves the same (see from_board).
+"""
+import array
+import collections
+
+from minesweeper import (Board, CellSequence, RippleTypes, SizeOutOfBoundException,
+                         ScatterException, IllegalIndicesException, IllegalMoveException)
+
+
+class SparseBoard(object):
+    """A board whose memory grows with its explored area."""
+
+    MINE = Board.MINE
+    HIDDEN, SHOWN, FLAGGED = Board.HIDDEN, Board.SHOWN, Board.FLAGGED
+    MAX_ROWS, MAX_COLUMNS = 10 ** 9, 10 ** 9
+    # a tile is TILE x TILE cells: (r, c) is in tile (r >> SHIFT, c >> SHIFT),
+    # at offset (r % TILE) * TILE + c % TILE
+    SHIFT = 6
+    TILE = 1 << SHIFT
+    _MASK = TILE - 1
+
+    def __init__(self, rows, columns, ripple_type=RippleTypes.Queue):
+        """Initializes an empty hidden board, with nothing allocated.
+
+        Args:
+            rows: the number of rows in the board
+            columns: the number of columns in the board
+            ripple_type: one of RippleTypes values, the order in which
+            ripple_sequence lists the cells (see Board.set_ripple_type)
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            SizeOutOfBoundException if the board size is smaller than 1x2
+            (rows first) or larger than MAX_ROWS x MAX_COLUMNS.
+
+        """
+        if rows < 1 or rows > self.MAX_ROWS or columns < 2 or columns > self.MAX_COLUMNS:
+            raise SizeOutOfBoundException
+
+        self.rows, self.columns = rows, columns
+        self.startState = True
+        # tile -> mine mask of its cells, by offset; without a layout to draw
+        # from, the tiles that are missing have no mines
+        self._mines = {}
+        self._mineCount = 0
+        # (mines, seed, excluded cells, sorted (tile, excluded cells of the
+        # tile) pairs) the tile masks are drawn from
+        self._layout = None
+        # tile -> (values, state) bytearrays of its cells, by offset
+        self._tiles = {}
+        self._uncoveredCount = 0
+        self._uncoveredMines = 0
+        self._flagCount = 0
+        self._pending = None
+        self.set_ripple_type(ripple_type)
+
+    @classmethod
+    def from_board(cls, board):
+        """Returns a SparseBoard with the mines and cell states of a Board.
+
+        Raises:
+            ValueError if the board has deferred mines (see
+            Board.defer_mines).
+
+        """
+        if board.getPendingMines():
+            raise ValueError('the mines of the board are not placed yet')
+        sparse = cls(board.getRows(), board.getColumns(), board.get_ripple_type())
+        columns, values = board.getColumns(), board._values
+        mine = bytearray([Board.MINE])
+        i = values.find(mine)
+        while i != -1:
+            key, offset = sparse._locate(i // columns, i % columns)
+            sparse._mines.setdefault(key, bytearray(cls.TILE * cls.TILE))[offset] = 1
+            sparse._mineCount += 1
+            i = values.find(mine, i + 1)
+        if sparse._mineCount:
+            sparse.startState = False
+        for (r, c) in board.getUncoveredCells():
+            sparse._show(r, c)
+        for (r, c) in board.getFlaggedCells():
+            sparse.flag(r, c)
+        return sparse
+
+    def _locate(self, row, column):
+        """Returns the tile and offset of a cell, validating its indices."""
+        if row < 0 or row >= self.rows or column < 0 or column >= self.columns:
+            raise IllegalIndicesException
+        shift, mask = self.SHIFT, self._MASK
+        return (row >> shift, column >> shift), ((row & mask) << shift) | (column & mask)
+
+    def getRows(self):
+        return self.rows
+
+    def getColumns(self):
+        return self.columns
+
+    def getUncoveredCount(self):
+        return self._uncoveredCount
+
+    def getHiddenSafeCount(self):
+        uncoveredSafe = self._uncoveredCount - self._uncoveredMines
+        return self.rows * self.columns - self._mineCount - uncoveredSafe
+
+    def getUncoveredMines(self):
+        return self._uncoveredMines
+
+    def getFlagCount(self):
+        return self._flagCount
+
+    def getPendingMines(self):
+        """Returns the number of mines deferred by defer_mines, or 0."""
+        return self._pending[0] if self._pending is not None else 0
+
+    def getMineCount(self):
+        return self._mineCount
+
+    def getTileCount(self):
+        """Returns the number of allocated tiles (see the module documentation)."""
+        return len(self._tiles)
+
+    def getMaskCount(self):
+        """Returns the number of tiles whose mines are stored."""
+        return len(self._mines)
+
+    def _cellsIn(self, state):
+        """Returns the (r,c) cells in the given state, in row-major order."""
+        shift, mask = self.SHIFT, self._MASK
+        cells, state = [], bytearray([state])
+        for ((tr, tc), (values, states)) in self._tiles.items():
+            i = states.find(state)
+            while i != -1:
+                cells.append(((tr << shift) | (i >> shift), (tc << shift) | (i & mask)))
+                i = states.find(state, i + 1)
+        cells.sort()
+        return cells
+
+    def getUncoveredCells(self):
+        return self._cellsIn(self.SHOWN)
+
+    def getFlaggedCells(self):
+        return self._cellsIn(self.FLAGGED)
+
+    def _around(self, r, c):
+        """Returns the cells around (r,c), clockwise from the one above.
+
+        Cells outside the board are skipped, like Board._neighbors does.
+        """
+        cells = [(r - 1, c), (r - 1, c + 1), (r, c + 1), (r + 1, c + 1),
+                 (r + 1, c), (r + 1, c - 1), (r, c - 1), (r - 1, c - 1)]
+        if 0 < r < self.rows - 1 and 0 < c < self.columns - 1:
+            return cells
+        rows, columns = self.rows, self.columns
+        return [(i, j) for (i, j) in cells if 0 <= i < rows and 0 <= j < columns]
+
+    def _tileSize(self, key):
+        """Returns the (height, width) of a tile, smaller on the board edges."""
+        (tr, tc) = key
+        return (min(self.TILE, self.rows - (tr << self.SHIFT)),
+                min(self.TILE, self.columns - (tc << self.SHIFT)))
+
+    def _tileMines(self, key):
+        """Returns the mine mask of a tile, drawing it if needed, or None.
+
+        None stands for a tile without mines, or off the board.
+        """
+        mask = self._mines.get(key)
+        if mask is None and self._layout is not None:
+            (height, width) = self._tileSize(key)
+            if key[0] >= 0 and key[1] >= 0 and height > 0 and width > 0:
+                mask = self._mines[key] = self._drawTile(key)
+        return mask
+
+    def _tileShare(self, key):
+        """Returns the number of mines of a tile.
+
+        The mines are shared out over the cells that are not excluded, tile
+        by tile in row-major order: a tile gets the increase of the
+        cumulative count mines * cells before / all cells over its cells, so
+        the shares add up to the mines, and each is within one of the
+        tile's cells * density (and never more than its cells).
+        """
+        (mines, seed, excluded, counts) = self._layout
+        (tr, tc) = key
+        (height, width) = self._tileSize(key)
+        before = (tr << self.SHIFT) * self.columns + height * (tc << self.SHIFT)
+        cells = height * width
+        for (other, count) in counts:
+            if other < key:
+                before -= count
+            elif other == key:
+                cells -= count
+        total = self.rows * self.columns - len(excluded)
+        return mines * (before + cells) // total - mines * before // total
+
+    def _drawTile(self, key):
+        """Returns the mine mask of a tile, drawn from the layout.
+
+        The tile's share of the mines (see _tileShare) is sampled from its
+        cells that are not excluded, by a random.Random seeded with the
+        layout seed and the tile, so a tile always gets the same mines.
+        """
+        import random
+        (mines, seed, excluded, counts) = self._layout
+        (tr, tc) = key
+        (height, width) = self._tileSize(key)
+        shift = self.SHIFT
+        cells = range(height * width)
+        if key in dict(counts):
+            top, left = tr << shift, tc << shift
+            cells = [i for i in cells if (top + i // width, left + i % width) not in excluded]
+        rng = random.Random((seed << 64) + (tr << 32) + tc)
+        mask = bytearray(self.TILE * self.TILE)
+        for i in rng.sample(cells, self._tileShare(key)):
+            mask[((i // width) << shift) | (i % width)] = 1
+        return mask
+
+    def _isMine(self, r, c):
+        shift, mask = self.SHIFT, self._MASK
+        mines = self._tileMines((r >> shift, c >> shift))
+        return mines is not None and mines[((r & mask) << shift) | (c & mask)] == 1
+
+    def _peek(self, r, c):
+        """Returns the (value, state) of a valid cell, allocating no tile.
+
+        The cells of tiles that are not allocated are hidden, and their
+        values are counted from the mines around them.
+        """
+        shift, mask = self.SHIFT, self._MASK
+        tile = self._tiles.get((r >> shift, c >> shift))
+        if tile is not None:
+            offset = ((r & mask) << shift) | (c & mask)
+            return tile[0][offset], tile[1][offset]
+        if self._isMine(r, c):
+            return self.MINE, self.HIDDEN
+        return len([cell for cell in self._around(r, c) if self._isMine(*cell)]), self.HIDDEN
+
+    def _tileValues(self, key):
+        """Returns the values of the cells of a tile, counted from the mines.
+
+        The mines of the tile, and the rows and columns of the tiles around
+        it that touch it, are copied into a grid of the tile with a border
+        of one cell. The grid is read as a big integer with a byte per cell,
+        and the counts are the sum of its shifts by each of the eight
+        neighbor offsets, so they are all added with C-level operations
+        (no count reaches a byte, so no carry crosses cells). Cells of the
+        tile that are off the board get counts too, but they are never
+        read.
+        """
+        size = self.TILE
+        width, last = size + 2, size - 1
+        bottom = (size + 1) * width
+        grid = bytearray(width * width)
+        (tr, tc) = key
+        mines = self._tileMines(key)
+        if mines is not None:
+            for r in range(size):
+                start = (r + 1) * width + 1
+                grid[start:start + size] = mines[r * size:(r + 1) * size]
+        # (tile, the grid cells it fills, its cells that fill them)
+        sides = [((tr - 1, tc), slice(1, 1 + size), slice(last * size, size * size)),
+                 ((tr + 1, tc), slice(bottom + 1, bottom + 1 + size), slice(0, size)),
+                 ((tr, tc - 1), slice(width, bottom, width), slice(last, size * size, size)),
+                 ((tr, tc + 1), slice(width + size + 1, bottom, width), slice(0, size * size, size)),
+                 ((tr - 1, tc - 1), slice(0, 1), slice(size * size - 1, size * size)),
+                 ((tr - 1, tc + 1), slice(size + 1, size + 2), slice(last * size, last * size + 1)),
+                 ((tr + 1, tc - 1), slice(bottom, bottom + 1), slice(last, size)),
+                 ((tr + 1, tc + 1), slice(bottom + size + 1, bottom + size + 2), slice(0, 1))]
+        for (other, cells, source) in sides:
+            around = self._tileMines(other)
+            if around is not None:
+                grid[cells] = around[source]
+
+        bits = int.from_bytes(grid, 'little')
+        total = 0
+        for offset in (1, width - 1, width, width + 1):
+            total += (bits >> 8 * offset) + (bits << 8 * offset)
+        total &= (1 << 8 * len(grid)) - 1
+        counts = total.to_bytes(len(grid), 'little')
+        values = bytearray(size * size)
+        for r in range(size):
+            start = (r + 1) * width + 1
+            values[r * size:(r + 1) * size] = counts[start:start + size]
+        if mines is not None:
+            # the mask bytes (0/1) times 0xFF clear the mine cells, and times
+            # MINE set them
+            bits, mask = int.from_bytes(values, 'little'), int.from_bytes(mines, 'little')
+            values = bits & ~(mask * 0xFF) | mask * self.MINE
+            values = bytearray(values.to_bytes(size * size, 'little'))
+        return values
+
+    def _tile(self, key):
+        """Returns the (values, state) of a tile, allocating it if needed."""
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = self._tiles[key] = (self._tileValues(key), bytearray(self.TILE * self.TILE))
+        return tile
+
+    def put_mines(self, mines, rng=None, exclude=()):
+        """Scatters the requested number of mines on the board.
+
+        This is Board.put_mines, except that the mines are only drawn when
+        their tiles are first read, so this takes O(1) time and memory
+        whatever the size of the board (see _drawTile). The mines are spread
+        evenly over the tiles: each tile gets its share of the mines (see
+        _tileShare), at random cells of the tile.
+
+        Args:
+            mines: the number of mines to scatter
+            rng: optional random.Random instance to draw the seed of the
+            mines from
+            exclude: (r,c) cells that must not get a mine (e.g. a first move)
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            ScatterException if the number of mines is smaller than 1 or larger
+            than (rows*columns - 1) or than the number of cells that are not
+            excluded, and if the board is not in beginning state
+            IllegalIndicesException if an excluded cell is out of bounds.
+
+        """
+        cells = self.rows * self.columns
+        for (r, c) in exclude:
+            self._locate(r, c)
+        excluded = frozenset(exclude)
+        if mines < 1 or mines > (cells-1) or (not self.startState):
+            raise ScatterException
+        if mines > cells - len(excluded):
+            raise ScatterException
+
+        self._place(mines, rng, excluded)
+
+    def _place(self, mines, rng, excluded):
+        if rng is None:
+            import random
+            rng = random
+        counts = collections.Counter(self._locate(r, c)[0] for (r, c) in excluded)
+        self._layout = (mines, rng.getrandbits(64), excluded, sorted(counts.items()))
+        self._mines = {}
+        self._mineCount = mines
+        # tiles allocated before the mines (by moves on the empty board) are
+        # counted again
+        self._uncoveredMines = 0
+        for (key, (values, state)) in self._tiles.items():
+            values[:] = self._tileValues(key)
+            shown = bytearray(2 * len(values))
+            shown[0::2] = values.translate(Board._MINE_PAIR_TABLE)
+            shown[1::2] = state
+            self._uncoveredMines += shown.count(b'\x02\x01')
+        self._pending = None
+        self.startState = False
+
+    def defer_mines(self, mines, opening=True, rng=None):
+        """Scatters the mines lazily, when the first cell is uncovered.
+
+        This is Board.defer_mines, without a pool: the first uncover keeps
+        its cell free of mines, and if opening is True (and there are enough
+        cells) also the cells around it.
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            ScatterException in the cases put_mines raises it.
+
+        """
+        if mines < 1 or mines > (self.rows * self.columns - 1) or (not self.startState):
+            raise ScatterException
+        self._pending = (mines, opening, rng)
+        self.startState = False
+
+    def get_value(self, row, column):
+        """Returns the value of a cell, '0'-'8' or '*' (see Board.get_value).
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+
+        """
+        self._locate(row, column)
+        return Board._SYMBOLS[self._peek(row, column)[0]]
+
+    def is_hidden(self, row, column):
+        """Returns 'H' if the cell is hidden (flagged or not), or 'S'.
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+
+        """
+        self._locate(row, column)
+        retval = 'H'
+        if self._peek(row, column)[1] == self.SHOWN:
+            retval = 'S'
+        return retval
+
+    def uncover(self, row, column):
+        """Changes the status of a cell from hidden to seen (see Board.uncover).
+
+        The tile of the cell is allocated if it isn't yet, and deferred
+        mines are scattered first, away from this cell.
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+            IllegalMoveException if the cell was already uncovered before,
+            or is flagged.
+
+        """
+        self._locate(row, column)
+        if self._peek(row, column)[1] != self.HIDDEN:
+            raise IllegalMoveException
+        if self._pending is not None:
+            (mines, opening, rng) = self._pending
+            excluded = set([(row, column)])
+            neighbors = self._around(row, column)
+            if opening and mines <= self.rows * self.columns - 1 - len(neighbors):
+                excluded.update(neighbors)
+            self._place(mines, rng, frozenset(excluded))
+        self._show(row, column)
+
+    def _show(self, row, column):
+        key, offset = self._locate(row, column)
+        (values, state) = self._tile(key)
+        state[offset] = self.SHOWN
+        self._uncoveredCount += 1
+        if values[offset] == self.MINE:
+            self._uncoveredMines += 1
+
+    def cover(self, row, column):
+        """Changes the status of a cell from seen back to hidden (see Board.cover).
+
+        The tile stays allocated.
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+            IllegalMoveException if the cell is hidden.
+
+        """
+        key, offset = self._locate(row, column)
+        if self._peek(row, column)[1] != self.SHOWN:
+            raise IllegalMoveException
+        (values, state) = self._tiles[key]
+        state[offset] = self.HIDDEN
+        self._uncoveredCount -= 1
+        if values[offset] == self.MINE:
+            self._uncoveredMines -= 1
+
+    def is_flagged(self, row, column):
+        """Returns True if the given cell is flagged, and False otherwise.
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+
+        """
+        self._locate(row, column)
+        return self._peek(row, column)[1] == self.FLAGGED
+
+    def flag(self, row, column):
+        """Flags a hidden cell, marking it as a mine (see Board.flag).
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+            IllegalMoveException if the cell is uncovered or already
+            flagged, or the mines of the board are still deferred.
+
+        """
+        key, offset = self._locate(row, column)
+        if self._peek(row, column)[1] != self.HIDDEN or self._pending is not None:
+            raise IllegalMoveException
+        self._tile(key)[1][offset] = self.FLAGGED
+        self._flagCount += 1
+
+    def unflag(self, row, column):
+        """Removes the flag of a cell, which stays hidden.
+
+        Returns:
+            None (alters self)
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+            IllegalMoveException if the cell is not flagged.
+
+        """
+        key, offset = self._locate(row, column)
+        if self._peek(row, column)[1] != self.FLAGGED:
+            raise IllegalMoveException
+        self._tiles[key][1][offset] = self.HIDDEN
+        self._flagCount -= 1
+
+    def get_ripple_type(self):
+        return self._rippleType
+
+    def set_ripple_type(self, ripple_type):
+        """Sets the order in which ripple_sequence lists the cells.
+
+        Raises:
+            ValueError if ripple_type is not a RippleTypes value.
+
+        """
+        if ripple_type not in (RippleTypes.Simple, RippleTypes.Recursive, RippleTypes.Queue):
+            raise ValueError('unknown ripple type: %r' % (ripple_type,))
+        self._rippleType = ripple_type
+
+    def _rippleSimple(self, start, visited):
+        """Ripples over row and column of start: up, right, down then left."""
+        (r, c) = start
+        directions = [(-1, 0, r), (0, 1, self.columns - 1 - c), (1, 0, self.rows - 1 - r),
+                      (0, -1, c)]
+        sequence = []
+        for (dr, dc, length) in directions:
+            cell = start
+            for k in range(length):
+                cell = (cell[0] + dr, cell[1] + dc)
+                (value, state) = self._peek(*cell)
+                if cell in visited or state != self.HIDDEN:
+                    break
+                visited.add(cell)
+                sequence.append(cell)
+                if value != 0:
+                    break
+        return sequence
+
+    def _rippleRecursive(self, start, visited):
+        """Ripples depth first, each cell followed by its own ripple."""
+        sequence = []
+        stack = [iter(self._around(*start))]
+        while stack:
+            for cell in stack[-1]:
+                if cell not in visited:
+                    (value, state) = self._peek(*cell)
+                    if state == self.HIDDEN:
+                        visited.add(cell)
+                        sequence.append(cell)
+                        if value == 0:
+                            stack.append(iter(self._around(*cell)))
+                            break
+            else:
+                stack.pop()
+        return sequence
+
+    def _rippleQueue(self, start, visited):
+        """Ripples breadth first, in the order of a BFS queue.
+
+        Only the cells without mines around them are queued, the others
+        would add nothing to the ripple.
+        """
+        sequence = []
+        queue = collections.deque([start])
+        while queue:
+            for cell in self._around(*queue.popleft()):
+                if cell not in visited:
+                    (value, state) = self._peek(*cell)
+                    if state == self.HIDDEN:
+                        visited.add(cell)
+                        sequence.append(cell)
+                        if value == 0:
+                            queue.append(cell)
+        return sequence
+
+    def _ripple(self):
+        """Returns the ripple method of the board's ripple type."""
+        if self._rippleType == RippleTypes.Simple:
+            return self._rippleSimple
+        elif self._rippleType == RippleTypes.Recursive:
+            return self._rippleRecursive
+        return self._rippleQueue
+
+    def ripple_sequence(self, row, column):
+        """Returns the ripple sequence starting on the specified cell.
+
+        The sequence is the one Board.ripple_sequence returns for the same
+        mines and states, in every ripple type. The visited cells are kept
+        in a set, so the ripple takes O(region) and allocates no tiles.
+
+        Returns:
+            A sequence of (r,c) tuples (both integers) to ripple, or empty
+            sequence in case there's nothing to ripple. Note this doesn't
+            alters self.
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+
+        """
+        self._locate(row, column)
+        if self._peek(row, column)[0] != 0:
+            return []
+        return self._ripple()((row, column), set([(row, column)]))
+
+    def ripple_cells(self, row, column):
+        """Returns the ripple sequence of a cell as a CellSequence.
+
+        The ripple itself keeps (r,c) tuples here (see ripple_sequence), so
+        this only compacts the sequence Game keeps in its journal.
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+
+        """
+        columns = self.columns
+        indices = array.array('q', [r * columns + c for (r, c) in self.ripple_sequence(row, column)])
+        return CellSequence(columns, indices)
+
+    def chord_sequence(self, row, column):
+        """Returns the cells to uncover when chording on the specified cell.
+
+        The sequence is the one Board.chord_sequence returns for the same
+        mines and states.
+
+        Raises:
+            IllegalIndicesException if rows/columns/both is out of bounds.
+            IllegalMoveException if the cell is hidden or a mine, or the
+            number of flags around it differs from its value.
+
+        """
+        self._locate(row, column)
+        (value, state) = self._peek(row, column)
+        if state != self.SHOWN or value == self.MINE:
+            raise IllegalMoveException
+        neighbors = self._around(row, column)
+        if len([cell for cell in neighbors if self._peek(*cell)[1] == self.FLAGGED]) != value:
+            raise IllegalMoveException
+
+        visited, ripple = set(), self._ripple()
+        sequence = []
+        for cell in neighbors:
+            if cell not in visited:
+                (value, state) = self._peek(*cell)
+                if state == self.HIDDEN:
+                    visited.add(cell)
+                    sequence.append(cell)
+                    if value == 0:
+                        sequence.extend(ripple(cell, visited))
+        return sequence
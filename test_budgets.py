@@ -0,0 +1,132 @@
+"""Checks of the memory and time budgets of large boards (see Board).
+
+The memory is measured with tracemalloc, which traces every allocation
+(and slows them down), so the memory checks use a smaller board than the
+time checks. The time bounds are loose, a few times the measured times,
+so they only fail when a path stops being linear or gets much slower.
+
+Usage:
+    python -m pytest test_budgets.py
+or
+    python -m unittest test_budgets
+"""
+import random
+import timeit
+import tracemalloc
+import unittest
+
+import minesweeper
+
+RIPPLE_TYPES = (minesweeper.RippleTypes.Simple, minesweeper.RippleTypes.Recursive,
+                minesweeper.RippleTypes.Queue)
+
+
+def _traced(function):
+    """Calls function under tracemalloc.
+
+    Returns:
+        (result, bytes still allocated, peak bytes allocated), both counted
+        from the call
+
+    """
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (result, current - base, peak - base)
+
+
+def _timed(function):
+    start = timeit.default_timer()
+    result = function()
+    return (result, timeit.default_timer() - start)
+
+
+class MemoryBudgetTest(unittest.TestCase):
+    """Board memory, and the memory of a move that uncovers a whole board."""
+
+    ROWS, COLUMNS = 300, 400
+
+    def test_board(self):
+        (board, current, peak) = _traced(
+            lambda: minesweeper.Board(self.ROWS, self.COLUMNS, True))
+        self.assertLessEqual(current, 2.1 * self.ROWS * self.COLUMNS)
+
+    def test_make_move(self):
+        cells = self.ROWS * self.COLUMNS
+        for rippleType in RIPPLE_TYPES:
+            game = minesweeper.Game(minesweeper.Board(self.ROWS, self.COLUMNS, True, rippleType))
+            # the middle row and column for Simple, the whole board otherwise
+            (value, current, peak) = _traced(
+                lambda: game.make_move(self.ROWS // 2, self.COLUMNS // 2))
+            self.assertEqual(value, '0')
+            # the visited bitmap (1 byte per cell) and the journal (4)
+            self.assertLessEqual(current, 5.5 * cells, rippleType)
+            # and the Recursive stack (5)
+            self.assertLessEqual(peak, 12 * cells, rippleType)
+            if rippleType != minesweeper.RippleTypes.Simple:
+                self.assertEqual(game.get_status(), minesweeper.GameStatus.Win)
+
+    def test_undo(self):
+        game = minesweeper.Game(minesweeper.Board(self.ROWS, self.COLUMNS, True))
+        game.make_move(0, 0)
+        (result, current, peak) = _traced(game.undo)
+        self.assertEqual(game.board.getUncoveredCount(), 0)
+        self.assertLessEqual(peak, 0.1 * self.ROWS * self.COLUMNS)
+
+    def test_unrendered(self):
+        # a game rendered once, then played without rendering (a bot)
+        game = minesweeper.Game(minesweeper.Board(16, 30))
+        game.board.put_mines(99, random.Random(0))
+        game.getMenu()
+        game.make_move(*[(r, c) for r in range(16) for c in range(30)
+                         if game.board.get_value(r, c) != '*'][0])
+
+        def loop():
+            for k in range(10000):
+                game.undo()
+                game.redo()
+        (result, current, peak) = _traced(loop)
+        # the cells kept for the next render are bounded by the board
+        self.assertLessEqual(current, 10000)
+
+
+class TimeBudgetTest(unittest.TestCase):
+    """The time of the hot paths on a large board, per cell they touch."""
+
+    ROWS, COLUMNS = 1000, 1000
+    # seconds per cell of a ripple (measured: a few microseconds)
+    RIPPLE_SECONDS = 30e-6
+    # seconds per cell of put_mines (measured: well under a microsecond)
+    PUT_MINES_SECONDS = 5e-6
+
+    def test_make_move(self):
+        cells = self.ROWS * self.COLUMNS
+        for rippleType in RIPPLE_TYPES:
+            game = minesweeper.Game(minesweeper.Board(self.ROWS, self.COLUMNS, True, rippleType))
+            (value, seconds) = _timed(lambda: game.make_move(self.ROWS // 2, self.COLUMNS // 2))
+            region = game.board.getUncoveredCount()
+            self.assertLessEqual(seconds, self.RIPPLE_SECONDS * region, rippleType)
+        self.assertEqual(region, cells)
+
+    def test_put_mines(self):
+        cells = self.ROWS * self.COLUMNS
+        for rng in (None, random.Random(0)):
+            board = minesweeper.Board(self.ROWS, self.COLUMNS, True)
+            (result, seconds) = _timed(lambda: board.put_mines(int(cells * 0.15), rng))
+            self.assertLessEqual(seconds, self.PUT_MINES_SECONDS * cells)
+
+    def test_get_status(self):
+        game = minesweeper.Game(minesweeper.Board(self.ROWS, self.COLUMNS, True))
+        game.board.put_mines(int(self.ROWS * self.COLUMNS * 0.15), random.Random(0))
+        (result, seconds) = _timed(lambda: [game.get_status() for i in range(10000)])
+        # O(1): no cell is looked at
+        self.assertLessEqual(seconds, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+"""Runs the differential harness (see differential.py) in the test suite.
+
+Every check runs on a few hundred seeded cases, the same on every run, so
+a mismatch with the reference fails the build. A failure shows the minimal
+case found by the harness, which differential.py can run again with more
+cases or other seeds.
+
+Usage:
+    python -m pytest test_differential.py
+or
+    python -m unittest test_differential
+"""
+import unittest
+
+import differential
+
+
+class DifferentialTest(unittest.TestCase):
+    """Every check of the harness against the reference."""
+
+    CASES = 300
+    SEED = '0'
+
+    def test_checks(self):
+        for name in sorted(differential.CHECKS):
+            with self.subTest(check=name):
+                failures = differential.run([name], self.CASES, self.SEED)
+                for (check, case, failure) in failures:
+                    self.fail('%s: %s\n%r' % (check, failure, case))
+
+
+if __name__ == '__main__':
+    unittest.main()
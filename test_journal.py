@@ -0,0 +1,91 @@
+"""Checks of the move journal of Game, and of games saved with it.
+
+A saved game (see Game.save) is played on with random moves, flags,
+chords, undos and redos, which are appended to its journal file, and then
+loaded again (see load_game): the loaded board must show the same cells.
+
+Usage:
+    python -m pytest test_journal.py
+or
+    python -m unittest test_journal
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import minesweeper
+
+RIPPLE_TYPES = (minesweeper.RippleTypes.Simple, minesweeper.RippleTypes.Recursive,
+                minesweeper.RippleTypes.Queue)
+
+
+def _cells(board):
+    """Returns the visible state of every cell, in row-major order."""
+    return [(board.is_hidden(r, c), board.is_flagged(r, c))
+            for r in range(board.getRows()) for c in range(board.getColumns())]
+
+
+def _play(game, rng, moves):
+    """Makes random moves on game, skipping the illegal ones."""
+    rows, columns = game.board.getRows(), game.board.getColumns()
+    actions = {'M': game.make_move, 'F': game.flag, 'C': game.chord}
+    for k in range(moves):
+        action = rng.choice('MMMFCUR')
+        try:
+            if action == 'U':
+                game.undo()
+            elif action == 'R':
+                game.redo()
+            else:
+                actions[action](rng.randrange(rows), rng.randrange(columns))
+        except minesweeper.IllegalMoveException:
+            pass
+
+
+class JournalTest(unittest.TestCase):
+    """Saving a game, playing on, and loading it back."""
+
+    GAMES = 100
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        for seed in range(self.GAMES):
+            rng = random.Random(seed)
+            rows, columns = rng.randint(2, 12), rng.randint(2, 12)
+            board = minesweeper.Board(rows, columns, False, RIPPLE_TYPES[seed % 3])
+            board.put_mines(rng.randint(1, rows * columns // 4), rng)
+            game = minesweeper.Game(board)
+            _play(game, rng, 3)
+            filename = os.path.join(self.directory, 'game%d' % seed)
+            game.save(filename)
+            _play(game, rng, 30)
+            # the game is loaded with the default (Queue) ripple type
+            loaded = minesweeper.load_game(filename)
+            self.assertEqual(_cells(loaded.board), _cells(game.board), seed)
+            self.assertEqual(loaded.get_status(), game.get_status(), seed)
+
+    def test_undo_after_load(self):
+        board = minesweeper.Board(10, 10, False, minesweeper.RippleTypes.Simple)
+        board.put_mines(1, random.Random(0))
+        game = minesweeper.Game(board)
+        filename = os.path.join(self.directory, 'game')
+        game.save(filename)
+        # the mine is far from the corner, so the move ripples
+        (mine,) = [(r, c) for r in range(10) for c in range(10) if board.get_value(r, c) == '*']
+        corner = (0, 0) if mine[0] + mine[1] > 4 else (9, 9)
+        game.make_move(*corner)
+        loaded = minesweeper.load_game(filename)
+        self.assertEqual(_cells(loaded.board), _cells(game.board))
+        loaded.undo()
+        self.assertEqual(loaded.board.getUncoveredCount(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
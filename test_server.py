@@ -0,0 +1,87 @@
+"""Checks of the game server (see server.Server), against localhost clients.
+
+The server runs in this process, on its own event loop, and every client
+plays a whole session over a TCP connection: a move, a save and an exit.
+
+Usage:
+    python -m pytest test_server.py
+or
+    python -m unittest test_server
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+import server
+
+
+async def _session(port, lines):
+    """Plays a session, sending lines, and returns all the server sent."""
+    (reader, writer) = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(''.join(line + '\n' for line in lines).encode())
+    await writer.drain()
+    text = (await reader.read()).decode()
+    writer.close()
+    await writer.wait_closed()
+    return text
+
+
+async def _serve(games, sessions):
+    """Runs games.start on a free port while sessions play on it.
+
+    Args:
+        games: a server.Server
+        sessions: a list of the lines of each session (see _session)
+
+    Returns:
+        the list of the texts of the sessions
+
+    """
+    listener = await games.start(port=0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        return await asyncio.gather(*[_session(port, lines) for lines in sessions])
+    finally:
+        listener.close()
+        await listener.wait_closed()
+
+
+class ServerTest(unittest.TestCase):
+    """Concurrent sessions, each with its own game."""
+
+    SESSIONS = 50
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_sessions(self):
+        games = server.Server(16, 30, 99, save_directory=self.directory)
+        sessions = [['3', '%d %d' % (k % 16, k % 30), '1', 'game%d' % k, '2']
+                    for k in range(self.SESSIONS)]
+        texts = asyncio.run(_serve(games, sessions))
+        for text in texts:
+            # the first move never hits a mine (see Board.defer_mines)
+            self.assertIn('Game status: InProgress', text)
+            self.assertIn('Save operation done', text)
+            self.assertTrue(text.endswith('Goodbye :)\n'), text[-100:])
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         sorted('game%d' % k for k in range(self.SESSIONS)))
+        self.assertEqual(games.sessions, 0)
+
+    def test_illegal(self):
+        games = server.Server(16, 30, 99)
+        (text,) = asyncio.run(_serve(games, [['4', '3', 'a b', '1', 'game', '2']]))
+        self.assertIn('Illegal choice', text)
+        self.assertIn('Illegal move values', text)
+        # there is no save directory
+        self.assertIn('Save operation failed', text)
+        self.assertIn('Game status: NotStarted', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
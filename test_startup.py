@@ -0,0 +1,68 @@
+"""Checks of the startup of the game (see minesweeper._numpy).
+
+The game is run as a script, as players run it, in a new interpreter that
+shows the first menu and exits. It must not import NumPy, nor the other
+modules the first menu doesn't need, and it must start quickly. The time
+bound is loose, many times the measured time, so it only fails when the
+startup gets much slower (e.g. NumPy imported again).
+
+Usage:
+    python -m pytest test_startup.py
+or
+    python -m unittest test_startup
+"""
+import os
+import subprocess
+import sys
+import timeit
+import unittest
+
+import minesweeper
+
+DIRECTORY = os.path.dirname(os.path.abspath(minesweeper.__file__))
+
+
+def _run(options, arguments, stdin):
+    """Runs minesweeper.py in a new interpreter.
+
+    Returns:
+        (the completed process, with its output captured, seconds it took)
+
+    """
+    start = timeit.default_timer()
+    process = subprocess.run([sys.executable] + options + ['minesweeper.py'] + arguments,
+                             input=stdin, cwd=DIRECTORY, capture_output=True, check=True)
+    return (process, timeit.default_timer() - start)
+
+
+class StartupTest(unittest.TestCase):
+    """A new game that shows its first menu and exits."""
+
+    ARGUMENTS = ['-r', '16', '-c', '30', '-m', '99']
+    # the modules imported lazily, by the first board generation or save
+    LAZY = ('numpy', 'random', 'tempfile', 'mmap')
+    # seconds to start, show the menu and exit (measured: about 0.1)
+    SECONDS = 2.0
+
+    def test_imports(self):
+        # -X importtime lists every module imported, with its name last
+        (process, seconds) = _run(['-X', 'importtime'], self.ARGUMENTS, b'2\n')
+        self.assertIn(b'Goodbye :)', process.stdout)
+        lines = process.stderr.decode().splitlines()
+        modules = set(line.split('|')[-1].strip() for line in lines
+                      if line.startswith('import time:'))
+        # the script's own imports are listed (the script itself isn't)
+        self.assertIn('argparse', modules)
+        for module in self.LAZY:
+            imported = [name for name in modules
+                        if name == module or name.startswith(module + '.')]
+            self.assertEqual(imported, [], module)
+
+    def test_time(self):
+        (process, seconds) = _run([], self.ARGUMENTS, b'2\n')
+        self.assertIn(b'Goodbye :)', process.stdout)
+        self.assertLessEqual(seconds, self.SECONDS)
+
+
+if __name__ == '__main__':
+    unittest.main()